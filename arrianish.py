@@ -6,7 +6,21 @@ from string_with_arrows import *
 
 import string
 import os
+import sys
+import io
+import mmap
+import atexit
 import math
+import random
+import heapq
+import itertools
+import pickle
+import time
+import asyncio
+import weakref
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 #######################################
 #             constants
@@ -57,16 +71,23 @@ class RTError(Error):
                 return result
 
         def generate_traceback(self):
-                result = ''
+                lines = []
                 pos = self.pos_start
                 ctx = self.context
 
                 while ctx:
-                        result = f'    file {pos.fn}, line {str(pos.ln + 1)}, in {ctx.display_name}\n' + result
+                        lines.append(f'    file {pos.fn}, line {str(pos.ln + 1)}, in {ctx.display_name}\n')
                         pos = ctx.parent_entry_pos
                         ctx = ctx.parent
 
-                return 'traceback (most recent call last):\n' + result
+                # deep recursion repeats the same line, only the first few of a run are shown
+                result = ['traceback (most recent call last):\n']
+                for line, group in itertools.groupby(reversed(lines)):
+                        count = len(list(group))
+                        result.append(line * min(count, 3))
+                        if count > 3: result.append(f'    [previous line repeated {count - 3} more times]\n')
+
+                return ''.join(result)
 
 #######################################
 #             position
@@ -107,12 +128,22 @@ tt_plus         = 'plus'
 tt_minus        = 'minus'
 tt_mul          = 'mul'
 tt_div          = 'div'
+tt_intdiv       = 'intdiv' # integer division
+tt_mod          = 'mod'
+tt_band         = 'band' # bitwise and
+tt_bor          = 'bor' # bitwise or
+tt_bxor         = 'bxor' # bitwise xor
+tt_lshift       = 'lshift'
+tt_rshift       = 'rshift'
 tt_pow          = 'pow'
 tt_eq           = 'eq'
 tt_lparen       = 'lparen'
 tt_rparen       = 'rparen'
 tt_lsquare      = 'lsquare'
 tt_rsquare      = 'rsquare'
+tt_lbrace       = 'lbrace'
+tt_rbrace       = 'rbrace'
+tt_colon        = 'colon'
 tt_ee           = 'ee' # equal to
 tt_ne           = 'ne' # not equal to
 tt_lt           = 'lt' # less than
@@ -135,13 +166,15 @@ keywords = [
         'else',
         'for',
         'to',
+        'in',
         'step',
         'while',
         'fun',
         'end',
         'return',
         'continue',
-        'break'
+        'break',
+        'yield'
 ]
 
 class Token:
@@ -206,7 +239,18 @@ class Lexer:
                                 tokens.append(Token(tt_mul, pos_start = self.pos))
                                 self.advance()
                         elif self.current_char == '/':
-                                tokens.append(Token(tt_div, pos_start = self.pos))
+                                tokens.append(self.make_div())
+                        elif self.current_char == '%':
+                                tokens.append(Token(tt_mod, pos_start = self.pos))
+                                self.advance()
+                        elif self.current_char == '&':
+                                tokens.append(Token(tt_band, pos_start = self.pos))
+                                self.advance()
+                        elif self.current_char == '|':
+                                tokens.append(Token(tt_bor, pos_start = self.pos))
+                                self.advance()
+                        elif self.current_char == '~':
+                                tokens.append(Token(tt_bxor, pos_start = self.pos))
                                 self.advance()
                         elif self.current_char == '^':
                                 tokens.append(Token(tt_pow, pos_start = self.pos))
@@ -223,6 +267,15 @@ class Lexer:
                         elif self.current_char == ']':
                                 tokens.append(Token(tt_rsquare, pos_start = self.pos))
                                 self.advance()
+                        elif self.current_char == '{':
+                                tokens.append(Token(tt_lbrace, pos_start = self.pos))
+                                self.advance()
+                        elif self.current_char == '}':
+                                tokens.append(Token(tt_rbrace, pos_start = self.pos))
+                                self.advance()
+                        elif self.current_char == ':':
+                                tokens.append(Token(tt_colon, pos_start = self.pos))
+                                self.advance()
                         elif self.current_char == '!':
                                 token, error = self.make_not_equals()
                                 if error: return [], error
@@ -309,6 +362,17 @@ class Lexer:
 
                 return Token(tok_type, pos_start=pos_start, pos_end=self.pos)
 
+        def make_div(self):
+                tok_type = tt_div
+                pos_start = self.pos.copy()
+                self.advance()
+
+                if self.current_char == '/':
+                        self.advance()
+                        tok_type = tt_intdiv
+
+                return Token(tok_type, pos_start=pos_start, pos_end=self.pos)
+
         def make_not_equals(self):
                 pos_start = self.pos.copy()
                 self.advance()
@@ -339,6 +403,9 @@ class Lexer:
                 if self.current_char == '=':
                         self.advance()
                         tok_type = tt_lte
+                elif self.current_char == '<':
+                        self.advance()
+                        tok_type = tt_lshift
 
                 return Token(tok_type, pos_start=pos_start, pos_end=self.pos)
 
@@ -350,6 +417,9 @@ class Lexer:
                 if self.current_char == '=':
                         self.advance()
                         tok_type = tt_gte
+                elif self.current_char == '>':
+                        self.advance()
+                        tok_type = tt_rshift
 
                 return Token(tok_type, pos_start=pos_start, pos_end=self.pos)
 
@@ -389,6 +459,18 @@ class ListNode:
         self.pos_start = pos_start
         self.pos_end = pos_end
 
+class MapNode:
+    def __init__(self, entry_nodes, pos_start, pos_end):
+        self.entry_nodes = entry_nodes
+        self.pos_start = pos_start
+        self.pos_end = pos_end
+
+class SetNode:
+    def __init__(self, element_nodes, pos_start, pos_end):
+        self.element_nodes = element_nodes
+        self.pos_start = pos_start
+        self.pos_end = pos_end
+
 class VarAccessNode:
     def __init__(self, var_name_tok):
         self.var_name_tok = var_name_tok
@@ -403,6 +485,30 @@ class VarAssignNode:
         self.pos_start = self.var_name_tok.pos_start
         self.pos_end = self.value_node.pos_end
 
+# the value method for each binary operator, keyword operators by their keyword
+binary_methods = {
+    tt_plus: 'added_to',
+    tt_minus: 'subbed_by',
+    tt_mul: 'multed_by',
+    tt_div: 'dived_by',
+    tt_intdiv: 'int_dived_by',
+    tt_mod: 'modded_by',
+    tt_band: 'bitwise_anded_by',
+    tt_bor: 'bitwise_ored_by',
+    tt_bxor: 'bitwise_xored_by',
+    tt_lshift: 'lshifted_by',
+    tt_rshift: 'rshifted_by',
+    tt_pow: 'powed_by',
+    tt_ee: 'get_comparison_eq',
+    tt_ne: 'get_comparison_ne',
+    tt_lt: 'get_comparison_lt',
+    tt_gt: 'get_comparison_gt',
+    tt_lte: 'get_comparison_lte',
+    tt_gte: 'get_comparison_gte',
+    'and': 'anded_by',
+    'or': 'ored_by'
+}
+
 class BinOpNode:
     def __init__(self, left_node, op_tok, right_node):
         self.left_node = left_node
@@ -411,6 +517,17 @@ class BinOpNode:
         self.pos_start = self.left_node.pos_start
         self.pos_end = self.right_node.pos_end
 
+        # the operator is resolved once here. the cache holds the operand types last seen
+        # and the operation for them, see Interpreter.binary_operation
+        self.method_name = binary_methods[op_tok.value if op_tok.type == tt_keyword else op_tok.type]
+        self.cache = None
+
+    # the cache is filled again after unpickling
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['cache'] = None
+        return state
+
     def __repr__(self):
         return f'({self.left_node}, {self.op_tok}, {self.right_node})'
 
@@ -444,6 +561,16 @@ class ForNode:
         self.pos_start = self.var_name_tok.pos_start
         self.pos_end = self.body_node.pos_end
 
+class ForEachNode:
+    def __init__(self, var_name_tok, iterable_node, body_node, should_return_null):
+        self.var_name_tok = var_name_tok
+        self.iterable_node = iterable_node
+        self.body_node = body_node
+        self.should_return_null = should_return_null
+
+        self.pos_start = self.var_name_tok.pos_start
+        self.pos_end = self.body_node.pos_end
+
 class WhileNode:
     def __init__(self, condition_node, body_node, should_return_null):
         self.condition_node = condition_node
@@ -454,11 +581,12 @@ class WhileNode:
         self.pos_end = self.body_node.pos_end
 
 class FuncDefNode:
-    def __init__(self, var_name_tok, arg_name_toks, body_node, should_auto_return):
+    def __init__(self, var_name_tok, arg_name_toks, body_node, should_auto_return, is_generator=False):
         self.var_name_tok = var_name_tok
         self.arg_name_toks = arg_name_toks
         self.body_node = body_node
         self.should_auto_return = should_auto_return
+        self.is_generator = is_generator
 
         if self.var_name_tok:
             self.pos_start = self.var_name_tok.pos_start
@@ -488,6 +616,13 @@ class ReturnNode:
         self.pos_start = pos_start
         self.pos_end = pos_end
 
+class YieldNode:
+    def __init__(self, node_to_yield, pos_start, pos_end):
+        self.node_to_yield = node_to_yield
+
+        self.pos_start = pos_start
+        self.pos_end = pos_end
+
 class ContinueNode:
     def __init__(self, pos_start, pos_end):
         self.pos_start = pos_start
@@ -543,6 +678,9 @@ class Parser:
     def __init__(self, tokens):
         self.tokens = tokens
         self.tok_idx = -1
+        # tracks whether the function body being parsed yields, making it a generator
+        self.function_depth = 0
+        self.found_yield = False
         self.advance()
 
     def advance(self):
@@ -621,6 +759,22 @@ class Parser:
                 self.reverse(res.to_reverse_count)
             return res.success(ReturnNode(expr, pos_start, self.current_tok.pos_start.copy()))
         
+        if self.current_tok.matches(tt_keyword, 'yield'):
+            if self.function_depth == 0:
+                return res.failure(InvalidSyntaxError(
+                    self.current_tok.pos_start, self.current_tok.pos_end,
+                    "'yield' can only be used inside a function"
+                ))
+
+            self.found_yield = True
+            res.register_advancement()
+            self.advance()
+
+            expr = res.try_register(self.expr())
+            if not expr:
+                self.reverse(res.to_reverse_count)
+            return res.success(YieldNode(expr, pos_start, self.current_tok.pos_start.copy()))
+
         if self.current_tok.matches(tt_keyword, 'continue'):
             res.register_advancement()
             self.advance()
@@ -635,7 +789,7 @@ class Parser:
         if res.error:
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
-                "expected 'return', 'continue', 'break', 'var', 'if', 'for', 'while', 'fun', int, float, identifier, '+', '-', '(', '[' or 'not'"
+                "expected 'return', 'yield', 'continue', 'break', 'var', 'if', 'for', 'while', 'fun', int, float, identifier, '+', '-', '(', '[' or 'not'"
             ))
         return res.success(expr)
 
@@ -704,7 +858,7 @@ class Parser:
         return self.bin_op(self.term, (tt_plus, tt_minus))
 
     def term(self):
-        return self.bin_op(self.factor, (tt_mul, tt_div))
+        return self.bin_op(self.factor, (tt_mul, tt_div, tt_intdiv, tt_mod, tt_band, tt_bor, tt_bxor, tt_lshift, tt_rshift))
 
     def factor(self):
         res = ParseResult()
@@ -799,6 +953,11 @@ class Parser:
             list_expr = res.register(self.list_expr())
             if res.error: return res
             return res.success(list_expr)
+
+        elif tok.type == tt_lbrace:
+            brace_expr = res.register(self.brace_expr())
+            if res.error: return res
+            return res.success(brace_expr)
         
         elif tok.matches(tt_keyword, 'if'):
             if_expr = res.register(self.if_expr())
@@ -872,6 +1031,74 @@ class Parser:
             self.current_tok.pos_end.copy()
         ))
 
+    # map and set literals share braces, the first element decides which one is being built
+    def brace_expr(self):
+        res = ParseResult()
+        pos_start = self.current_tok.pos_start.copy()
+
+        if self.current_tok.type != tt_lbrace:
+            return res.failure(InvalidSyntaxError(
+                self.current_tok.pos_start, self.current_tok.pos_end,
+                f"expected '{{'"
+            ))
+
+        res.register_advancement()
+        self.advance()
+
+        if self.current_tok.type == tt_rbrace:
+            res.register_advancement()
+            self.advance()
+            return res.success(MapNode([], pos_start, self.current_tok.pos_end.copy()))
+
+        first_node = res.register(self.expr())
+        if res.error:
+            return res.failure(InvalidSyntaxError(
+                self.current_tok.pos_start, self.current_tok.pos_end,
+                "expected '}', 'var', 'if', 'for', 'while', 'fun', int, float, identifier, '+', '-', '(', '[', '{' or 'not'"
+            ))
+
+        is_map = self.current_tok.type == tt_colon
+        entry_nodes = []
+        element_nodes = []
+
+        while True:
+            if is_map:
+                if self.current_tok.type != tt_colon:
+                    return res.failure(InvalidSyntaxError(
+                        self.current_tok.pos_start, self.current_tok.pos_end,
+                        "expected ':'"
+                    ))
+
+                res.register_advancement()
+                self.advance()
+
+                value_node = res.register(self.expr())
+                if res.error: return res
+                entry_nodes.append((first_node, value_node))
+            else:
+                element_nodes.append(first_node)
+
+            if self.current_tok.type != tt_comma: break
+
+            res.register_advancement()
+            self.advance()
+
+            first_node = res.register(self.expr())
+            if res.error: return res
+
+        if self.current_tok.type != tt_rbrace:
+            return res.failure(InvalidSyntaxError(
+                self.current_tok.pos_start, self.current_tok.pos_end,
+                f"expected ',' or '}}'"
+            ))
+
+        res.register_advancement()
+        self.advance()
+
+        if is_map:
+            return res.success(MapNode(entry_nodes, pos_start, self.current_tok.pos_end.copy()))
+        return res.success(SetNode(element_nodes, pos_start, self.current_tok.pos_end.copy()))
+
     def if_expr(self):
         res = ParseResult()
         all_cases = res.register(self.if_expr_cases('if'))
@@ -1003,38 +1230,49 @@ class Parser:
         res.register_advancement()
         self.advance()
 
-        if self.current_tok.type != tt_eq:
-            return res.failure(InvalidSyntaxError(
-                self.current_tok.pos_start, self.current_tok.pos_end,
-                f"expected '='"
-            ))
-        
-        res.register_advancement()
-        self.advance()
+        if self.current_tok.matches(tt_keyword, 'in'):
+            res.register_advancement()
+            self.advance()
 
-        start_value = res.register(self.expr())
-        if res.error: return res
+            iterable = res.register(self.expr())
+            if res.error: return res
 
-        if not self.current_tok.matches(tt_keyword, 'to'):
-            return res.failure(InvalidSyntaxError(
-                self.current_tok.pos_start, self.current_tok.pos_end,
-                f"expected 'to'"
-            ))
+            make_node = lambda body, should_return_null: ForEachNode(var_name, iterable, body, should_return_null)
+        else:
+            if self.current_tok.type != tt_eq:
+                return res.failure(InvalidSyntaxError(
+                    self.current_tok.pos_start, self.current_tok.pos_end,
+                    f"expected '=' or 'in'"
+                ))
 
-        res.register_advancement()
-        self.advance()
+            res.register_advancement()
+            self.advance()
 
-        end_value = res.register(self.expr())
-        if res.error: return res
+            start_value = res.register(self.expr())
+            if res.error: return res
+
+            if not self.current_tok.matches(tt_keyword, 'to'):
+                return res.failure(InvalidSyntaxError(
+                    self.current_tok.pos_start, self.current_tok.pos_end,
+                    f"expected 'to'"
+                ))
 
-        if self.current_tok.matches(tt_keyword, 'step'):
             res.register_advancement()
             self.advance()
 
-            step_value = res.register(self.expr())
+            end_value = res.register(self.expr())
             if res.error: return res
-        else:
-            step_value = None
+
+            if self.current_tok.matches(tt_keyword, 'step'):
+                res.register_advancement()
+                self.advance()
+
+                step_value = res.register(self.expr())
+                if res.error: return res
+            else:
+                step_value = None
+
+            make_node = lambda body, should_return_null: ForNode(var_name, start_value, end_value, step_value, body, should_return_null)
 
         if not self.current_tok.matches(tt_keyword, 'then'):
             return res.failure(InvalidSyntaxError(
@@ -1061,12 +1299,12 @@ class Parser:
             res.register_advancement()
             self.advance()
 
-            return res.success(ForNode(var_name, start_value, end_value, step_value, body, True))
+            return res.success(make_node(body, True))
         
         body = res.register(self.statement())
         if res.error: return res
 
-        return res.success(ForNode(var_name, start_value, end_value, step_value, body, False))
+        return res.success(make_node(body, False))
 
     def while_expr(self):
         res = ParseResult()
@@ -1186,14 +1424,16 @@ class Parser:
             res.register_advancement()
             self.advance()
 
-            body = res.register(self.expr())
+            func_body = res.register(self.func_body(self.expr))
             if res.error: return res
+            body, is_generator = func_body
 
             return res.success(FuncDefNode(
                 var_name_tok,
                 arg_name_toks,
                 body,
-                True
+                True,
+                is_generator
             ))
         
         if self.current_tok.type != tt_newline:
@@ -1205,8 +1445,9 @@ class Parser:
         res.register_advancement()
         self.advance()
 
-        body = res.register(self.statements())
+        func_body = res.register(self.func_body(self.statements))
         if res.error: return res
+        body, is_generator = func_body
 
         if not self.current_tok.matches(tt_keyword, 'end'):
             return res.failure(InvalidSyntaxError(
@@ -1221,9 +1462,26 @@ class Parser:
             var_name_tok,
             arg_name_toks,
             body,
-            False
+            False,
+            is_generator
         ))
 
+    # parses a function body, noting whether it yields so it can be defined as a generator
+    def func_body(self, parse_body):
+        res = ParseResult()
+        outer_found_yield = self.found_yield
+        self.found_yield = False
+        self.function_depth += 1
+
+        body = res.register(parse_body())
+
+        self.function_depth -= 1
+        is_generator = self.found_yield
+        self.found_yield = outer_found_yield
+
+        if res.error: return res
+        return res.success((body, is_generator))
+
     ###################################
 
     # binary operations
@@ -1245,6 +1503,338 @@ class Parser:
 
         return res.success(left)
 
+#######################################
+#             optimizer
+#######################################
+
+# nodes only made by the optimizer. each one keeps what is needed to do what the tree
+# it replaced did, for when its optimization doesn't hold while the program runs
+
+class InlineCallNode:
+    # a call of a small function replaced by the function's expression, with the arguments
+    # put in place of the parameters. only taken when the name called still refers to that
+    # function, otherwise, or if the expression fails, the original call is made instead
+    def __init__(self, call_node, body_node, inlined_node, checked_names, scalar_names):
+        self.call_node = call_node
+        self.func_name = call_node.node_to_call.var_name_tok.value
+        self.body_node = body_node
+        self.inlined_node = inlined_node
+        # variables passed as arguments the expression might not read, which still have to be defined
+        self.checked_names = checked_names
+        # variables which have to hold numbers or strings for the expression to change nothing
+        self.scalar_names = scalar_names
+
+        self.pos_start = call_node.pos_start
+        self.pos_end = call_node.pos_end
+
+class HoistNode:
+    # a loop whose invariant expressions are worked out once per run of the loop. their
+    # values are kept in the loop's scope under names no variable can have, and removed
+    # once the loop finishes
+    def __init__(self, loop_node, slots):
+        self.loop_node = loop_node
+        self.slots = slots
+
+        self.pos_start = loop_node.pos_start
+        self.pos_end = loop_node.pos_end
+
+class HoistedNode:
+    # the value is only kept while working it out changes nothing: the variables named hold
+    # numbers or strings, and the calls inlined in it refer to the functions they inline
+    def __init__(self, node, slot, scalar_names, inlined_functions):
+        self.node = node
+        self.slot = slot
+        self.scalar_names = scalar_names
+        # name -> body node, a dict so the bodies aren't taken as child nodes
+        self.inlined_functions = inlined_functions
+
+        self.pos_start = node.pos_start
+        self.pos_end = node.pos_end
+
+def is_node(value):
+    return hasattr(value, 'pos_start') and not isinstance(value, Token)
+
+# replaces every node held by node, including those in lists and tuples, with function(child)
+def map_child_nodes(node, function):
+    def mapped(value):
+        if isinstance(value, list): return [mapped(element) for element in value]
+        if isinstance(value, tuple): return tuple(mapped(element) for element in value)
+        if is_node(value): return function(value)
+        return value
+
+    for name, value in list(vars(node).items()):
+        setattr(node, name, mapped(value))
+
+def child_nodes(node):
+    children = []
+
+    def collect(value):
+        if isinstance(value, (list, tuple)):
+            for element in value: collect(element)
+        elif is_node(value):
+            children.append(value)
+
+    for value in vars(node).values(): collect(value)
+    return children
+
+# whether running the node reaches one of the node types, the bodies of functions it defines run apart
+def reaches_node(node, node_types):
+    if isinstance(node, node_types): return True
+    if isinstance(node, FuncDefNode): return False
+    return any(reaches_node(child, node_types) for child in child_nodes(node))
+
+def holds_scalars(symbol_table, names):
+    for name in names:
+        if not isinstance(symbol_table.get(name), (Number, String)): return False
+    return True
+
+def is_inlined_function(symbol_table, name, body_node):
+    function = symbol_table.get(name)
+    return isinstance(function, Function) and function.body_node is body_node
+
+class Optimizer:
+    # rewrites a program's tree before it runs. calls of small functions made of a single
+    # expression are inlined, and expressions in loops which can't change while the loop
+    # runs are only worked out once. scopes are dynamic, so both are checked as the
+    # program runs, see InlineCallNode and HoistNode
+    max_inline_size = 20
+    slots = itertools.count(1)
+    # operators which change a list on their left in place
+    mutating_operators = (tt_plus, tt_minus, tt_mul)
+    # operators whose result is a number whatever they are given
+    number_operators = (tt_ee, tt_ne, tt_lt, tt_gt, tt_lte, tt_gte, tt_keyword)
+
+    def optimize(self, node):
+        self.functions = self.inlinable_functions(node)
+        node = self.inline(node)
+        return self.hoist(node)
+
+    ###################################
+
+    # named functions defined once, never assigned with var, whose body is a small expression
+    def inlinable_functions(self, node):
+        definitions, assigned = {}, set()
+
+        def collect(node):
+            if isinstance(node, FuncDefNode) and node.var_name_tok:
+                definitions.setdefault(node.var_name_tok.value, []).append(node)
+            elif isinstance(node, VarAssignNode):
+                assigned.add(node.var_name_tok.value)
+
+            for child in child_nodes(node): collect(child)
+        collect(node)
+
+        functions = {}
+
+        for name, nodes in definitions.items():
+            func_def = nodes[0]
+            arg_names = [arg_name_tok.value for arg_name_tok in func_def.arg_name_toks]
+
+            if (
+                len(nodes) == 1 and name not in assigned and
+                func_def.should_auto_return and not func_def.is_generator and
+                len(set(arg_names)) == len(arg_names) and
+                self.size(func_def.body_node) <= self.max_inline_size and
+                self.is_expression(func_def.body_node, allow_if=True)
+            ):
+                functions[name] = func_def
+
+        return functions
+
+    def size(self, node):
+        return 1 + sum(self.size(child) for child in child_nodes(node))
+
+    # expressions without calls. the only side effect they can have is an operator changing a
+    # list in place, which is ruled out as they run by scalar_names
+    def is_expression(self, node, allow_if=False):
+        if isinstance(node, (NumberNode, StringNode, VarAccessNode)):
+            return True
+        if isinstance(node, BinOpNode):
+            return self.is_expression(node.left_node, allow_if) and self.is_expression(node.right_node, allow_if)
+        if isinstance(node, UnaryOpNode):
+            return self.is_expression(node.node, allow_if)
+        if isinstance(node, IfNode) and allow_if:
+            cases = node.cases + ([(None,) + node.else_case] if node.else_case else [])
+            return all(
+                not should_return_null and (condition is None or self.is_expression(condition, allow_if)) and self.is_expression(expr, allow_if)
+                for condition, expr, should_return_null in cases
+            )
+        return False
+
+    # expressions which can only give a number or a string, or fail
+    def is_scalar(self, node):
+        if isinstance(node, (NumberNode, StringNode)):
+            return True
+        if isinstance(node, BinOpNode):
+            return node.op_tok.type in self.number_operators or self.is_scalar(node.left_node)
+        if isinstance(node, UnaryOpNode):
+            return node.op_tok.type == tt_keyword or self.is_scalar(node.node)
+        if isinstance(node, IfNode):
+            return all(self.is_scalar(expr) for _, expr, _ in node.cases) and (not node.else_case or self.is_scalar(node.else_case[0]))
+        if isinstance(node, HoistedNode):
+            return self.is_scalar(node.node)
+        if isinstance(node, InlineCallNode):
+            return self.is_scalar(node.inlined_node)
+        return False
+
+    # names read by the left side of operators which would change it if it was a list. an
+    # expression changes nothing while they hold numbers or strings. calls inlined in the
+    # expression are added to functions, from inlined calls only the expression is looked at
+    def scalar_names(self, node, names, functions):
+        if isinstance(node, InlineCallNode):
+            functions[node.func_name] = node.body_node
+            return self.scalar_names(node.inlined_node, names, functions)
+
+        if isinstance(node, BinOpNode) and node.op_tok.type in self.mutating_operators and not self.is_scalar(node.left_node):
+            self.read_names(node.left_node, names)
+
+        for child in child_nodes(node): self.scalar_names(child, names, functions)
+        return names
+
+    def read_names(self, node, names):
+        if isinstance(node, VarAccessNode):
+            names.add(node.var_name_tok.value)
+        elif isinstance(node, InlineCallNode):
+            self.read_names(node.inlined_node, names)
+        else:
+            for child in child_nodes(node): self.read_names(child, names)
+
+    # number of times an expression reads a name, and how many of those always happen
+    def uses(self, node, name):
+        if isinstance(node, VarAccessNode):
+            return (1, 1) if node.var_name_tok.value == name else (0, 0)
+
+        total, always = 0, 0
+        for child in child_nodes(node):
+            child_total, child_always = self.uses(child, name)
+            total += child_total
+
+            # only the left side of 'and'/'or' and the first condition of an if always run
+            if isinstance(node, BinOpNode) and node.op_tok.type == tt_keyword and child is node.right_node: continue
+            if isinstance(node, IfNode) and child is not node.cases[0][0]: continue
+            always += child_always
+
+        return total, always
+
+    def inline(self, node):
+        map_child_nodes(node, self.inline)
+
+        if not isinstance(node, CallNode) or not isinstance(node.node_to_call, VarAccessNode): return node
+        func_def = self.functions.get(node.node_to_call.var_name_tok.value)
+        if not func_def or len(node.arg_nodes) != len(func_def.arg_name_toks): return node
+
+        arguments, checked_names = {}, []
+
+        for arg_name_tok, arg_node in zip(func_def.arg_name_toks, node.arg_nodes):
+            total, always = self.uses(func_def.body_node, arg_name_tok.value)
+
+            if isinstance(arg_node, (NumberNode, StringNode, VarAccessNode)):
+                if isinstance(arg_node, VarAccessNode) and not always: checked_names.append(arg_node.var_name_tok.value)
+            # anything else is only put in place of a parameter which is read exactly once,
+            # and always, so it is evaluated once like the argument would have been
+            elif not self.is_expression(arg_node) or total != 1 or always != 1:
+                return node
+
+            arguments[arg_name_tok.value] = arg_node
+
+        inlined_node = self.substitute(func_def.body_node, arguments)
+        scalar_names = sorted(self.scalar_names(inlined_node, set(), {}))
+        return InlineCallNode(node, func_def.body_node, inlined_node, checked_names, scalar_names)
+
+    # a copy of an expression with the arguments in place of the parameters
+    def substitute(self, node, arguments):
+        if isinstance(node, VarAccessNode):
+            return arguments.get(node.var_name_tok.value, node)
+        if isinstance(node, BinOpNode):
+            return BinOpNode(self.substitute(node.left_node, arguments), node.op_tok, self.substitute(node.right_node, arguments))
+        if isinstance(node, UnaryOpNode):
+            return UnaryOpNode(node.op_tok, self.substitute(node.node, arguments))
+        if isinstance(node, IfNode):
+            return IfNode(
+                [(self.substitute(condition, arguments), self.substitute(expr, arguments), should_return_null) for condition, expr, should_return_null in node.cases],
+                (self.substitute(node.else_case[0], arguments), node.else_case[1]) if node.else_case else None
+            )
+        return node
+
+    ###################################
+
+    # inlined calls hold the body of the function they inline, which isn't part of any loop
+    def hoist(self, node):
+        if isinstance(node, InlineCallNode): return node
+
+        if isinstance(node, (ForNode, WhileNode)) and self.is_pure_loop(node):
+            loop_node = self.hoist_loop(node)
+            map_child_nodes(node, self.hoist)
+            return loop_node
+
+        map_child_nodes(node, self.hoist)
+        return node
+
+    # names a loop assigns in its own scope. function bodies run in scopes of their own
+    def assigned_names(self, node, names):
+        if isinstance(node, VarAssignNode):
+            names.add(node.var_name_tok.value)
+        elif isinstance(node, (ForNode, ForEachNode)):
+            names.add(node.var_name_tok.value)
+        elif isinstance(node, FuncDefNode):
+            if node.var_name_tok: names.add(node.var_name_tok.value)
+            return names
+
+        for child in child_nodes(node): self.assigned_names(child, names)
+        return names
+
+    # a loop without calls, yields or for-in loops runs no code of anyone else's, so nothing
+    # but the loop itself can change the variables it reads. inlined calls are only made
+    # while their name isn't assigned by the loop
+    def is_pure_loop(self, node):
+        assigned = self.assigned_names(node, set())
+
+        def is_pure(node):
+            if isinstance(node, (CallNode, YieldNode, ForEachNode)): return False
+            if isinstance(node, InlineCallNode): return node.func_name not in assigned
+            if isinstance(node, FuncDefNode): return True
+            return all(is_pure(child) for child in child_nodes(node))
+
+        return is_pure(node)
+
+    def hoist_loop(self, node):
+        assigned = self.assigned_names(node, set())
+        slots = []
+
+        def replace(child):
+            if isinstance(child, (BinOpNode, UnaryOpNode, InlineCallNode)) and self.is_invariant(child, assigned):
+                slot = f'<hoisted {next(self.slots)}>'
+                slots.append(slot)
+                functions = {}
+                scalar_names = sorted(self.scalar_names(child, set(), functions))
+                return HoistedNode(child, slot, scalar_names, functions)
+
+            if not isinstance(child, (FuncDefNode, InlineCallNode, HoistedNode)): map_child_nodes(child, replace)
+            return child
+
+        if isinstance(node, WhileNode): node.condition_node = replace(node.condition_node)
+        node.body_node = replace(node.body_node)
+
+        return HoistNode(node, slots) if slots else node
+
+    def is_invariant(self, node, assigned):
+        if isinstance(node, (NumberNode, StringNode, HoistedNode)):
+            return True
+        if isinstance(node, VarAccessNode):
+            return node.var_name_tok.value not in assigned
+        if isinstance(node, BinOpNode):
+            return self.is_invariant(node.left_node, assigned) and self.is_invariant(node.right_node, assigned)
+        if isinstance(node, UnaryOpNode):
+            return self.is_invariant(node.node, assigned)
+        if isinstance(node, IfNode):
+            return all(self.is_invariant(child, assigned) for child in child_nodes(node))
+        if isinstance(node, InlineCallNode):
+            return (
+                node.func_name not in assigned and not set(node.checked_names) & assigned and
+                self.is_invariant(node.inlined_node, assigned)
+            )
+        return False
+
 #######################################
 #           runtime result
 #######################################
@@ -1301,6 +1891,48 @@ class RTResult:
             self.loop_should_break
         )
 
+#######################################
+#              output
+#######################################
+
+class Output:
+    def __init__(self, stream=None, buffer_size=io.DEFAULT_BUFFER_SIZE * 8, line_buffered=False):
+        # None writes to whatever sys.stdout is when the buffer is flushed
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.line_buffered = line_buffered
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+
+        if self.size >= self.buffer_size or (self.line_buffered and '\n' in text):
+            self.flush()
+
+    # writes lists piece by piece rather than building their whole string first
+    def write_value(self, value):
+        if isinstance(value, List):
+            for i, element in enumerate(value.elements):
+                if i > 0: self.write(', ')
+                self.write_value(element)
+        else:
+            self.write(str(value))
+
+    def flush(self):
+        if self.parts:
+            stream = self.stream or sys.stdout
+            stream.write(''.join(self.parts))
+            stream.flush()
+            self.parts = []
+            self.size = 0
+
+    # sends output to another stream, such as an io.StringIO when embedding arrianish
+    def redirect(self, stream):
+        self.flush()
+        self.stream = stream
+
 #######################################
 #             values
 #######################################
@@ -1331,6 +1963,27 @@ class Value:
     def dived_by(self, other):
         return None, self.illegal_operation(other)
 
+    def int_dived_by(self, other):
+        return None, self.illegal_operation(other)
+
+    def modded_by(self, other):
+        return None, self.illegal_operation(other)
+
+    def bitwise_anded_by(self, other):
+        return None, self.illegal_operation(other)
+
+    def bitwise_ored_by(self, other):
+        return None, self.illegal_operation(other)
+
+    def bitwise_xored_by(self, other):
+        return None, self.illegal_operation(other)
+
+    def lshifted_by(self, other):
+        return None, self.illegal_operation(other)
+
+    def rshifted_by(self, other):
+        return None, self.illegal_operation(other)
+
     def powed_by(self, other):
         return None, self.illegal_operation(other)
 
@@ -1367,9 +2020,28 @@ class Value:
     def copy(self):
         raise Exception('no copy method defined')
 
+    # key used to store the value in a map or set, None if the value can't be used as a key
+    def hash_key(self):
+        return None
+
+    # python iterator over the values held, used by for-each loops. lazily produced
+    # values may yield an Error instead of a value to stop the loop with that error
+    def iterate(self):
+        return None, RTError(
+            self.pos_start, self.pos_end,
+            'value is not iterable',
+            self.context
+        )
+
     def is_true(self):
         return False
 
+    # values are pickled without their context, so they can be sent to worker processes
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['context'] = None
+        return state
+
     def illegal_operation(self, other=None):
         if not other: other = self
         return RTError(
@@ -1414,6 +2086,82 @@ class Number(Value):
         else:
             return None, Value.illegal_operation(self, other)
 
+    def int_dived_by(self, other):
+        if isinstance(other, Number):
+            if other.value == 0:
+                return None, RTError(
+                    other.pos_start, other.pos_end,
+                    'division by zero',
+                    self.context
+                )
+
+            return Number(self.value // other.value).set_context(self.context), None
+        else:
+            return None, Value.illegal_operation(self, other)
+
+    def modded_by(self, other):
+        if isinstance(other, Number):
+            if other.value == 0:
+                return None, RTError(
+                    other.pos_start, other.pos_end,
+                    'modulo by zero',
+                    self.context
+                )
+
+            return Number(self.value % other.value).set_context(self.context), None
+        else:
+            return None, Value.illegal_operation(self, other)
+
+    def bitwise_anded_by(self, other):
+        error = self.check_bitwise_operand(other)
+        if error: return None, error
+        return Number(self.value & other.value).set_context(self.context), None
+
+    def bitwise_ored_by(self, other):
+        error = self.check_bitwise_operand(other)
+        if error: return None, error
+        return Number(self.value | other.value).set_context(self.context), None
+
+    def bitwise_xored_by(self, other):
+        error = self.check_bitwise_operand(other)
+        if error: return None, error
+        return Number(self.value ^ other.value).set_context(self.context), None
+
+    def lshifted_by(self, other):
+        error = self.check_bitwise_operand(other) or self.check_shift_count(other)
+        if error: return None, error
+        return Number(self.value << other.value).set_context(self.context), None
+
+    def rshifted_by(self, other):
+        error = self.check_bitwise_operand(other) or self.check_shift_count(other)
+        if error: return None, error
+        return Number(self.value >> other.value).set_context(self.context), None
+
+    def check_bitwise_operand(self, other):
+        if not isinstance(other, Number):
+            return Value.illegal_operation(self, other)
+
+        # bitwise operations are only defined for whole numbers
+        for operand in (self, other):
+            if not isinstance(operand.value, int):
+                return RTError(
+                    operand.pos_start, operand.pos_end,
+                    'bitwise operations require integers',
+                    self.context
+                )
+
+        return None
+
+    def check_shift_count(self, other):
+        if other.value < 0:
+            return RTError(
+                other.pos_start, other.pos_end,
+                'negative shift count',
+                self.context
+            )
+
+        return None
+
     def powed_by(self, other):
         if isinstance(other, Number):
             return Number(self.value ** other.value).set_context(self.context), None
@@ -1480,6 +2228,9 @@ class Number(Value):
     def is_true(self):
         return self.value != 0
 
+    def hash_key(self):
+        return self.value
+
     def __str__(self):
         return str(self.value)
     
@@ -1491,6 +2242,27 @@ Number.null = Number(0)
 Number.false = Number(0)
 Number.true = Number(1)
 Number.math_PI = Number(math.pi)
+Number.math_E = Number(math.e)
+
+# operations on the values of two numbers, for the interpreter's fast path. the ones not
+# listed, and divisions by zero, go through the methods above
+Number.operations = {
+    'added_to': lambda a, b: a + b,
+    'subbed_by': lambda a, b: a - b,
+    'multed_by': lambda a, b: a * b,
+    'dived_by': lambda a, b: a / b,
+    'int_dived_by': lambda a, b: a // b,
+    'modded_by': lambda a, b: a % b,
+    'powed_by': lambda a, b: a ** b,
+    'get_comparison_eq': lambda a, b: int(a == b),
+    'get_comparison_ne': lambda a, b: int(a != b),
+    'get_comparison_lt': lambda a, b: int(a < b),
+    'get_comparison_gt': lambda a, b: int(a > b),
+    'get_comparison_lte': lambda a, b: int(a <= b),
+    'get_comparison_gte': lambda a, b: int(a >= b),
+    'anded_by': lambda a, b: int(a and b),
+    'ored_by': lambda a, b: int(a or b)
+}
 
 class String(Value):
     def __init__(self, value):
@@ -1509,34 +2281,89 @@ class String(Value):
         else:
             return None, Value.illegal_operation(self, other)
 
-    def is_true(self):
-        return len(self.value) > 0
-
-    def copy(self):
-        copy = String(self.value)
-        copy.set_pos(self.pos_start, self.pos_end)
-        copy.set_context(self.context)
-        return copy
-
-    def __str__(self):
-        return self.value
-
-    def __repr__(self):
-        return f'"{self.value}"'
-
-class List(Value):
-    def __init__(self, elements):
-        super().__init__()
-        self.elements = elements
-
-    def added_to(self, other):
-        new_list = self.copy()
-        new_list.elements.append(other)
-        return new_list, None
-
-    def subbed_by(self, other):
+    def dived_by(self, other):
         if isinstance(other, Number):
-            new_list = self.copy()
+            try:
+                return String(self.value[other.value]).set_context(self.context), None
+            except:
+                return None, RTError(
+                    other.pos_start, other.pos_end,
+                    'character at this index could not be retrieved from string because index is out of bounds',
+                    self.context
+                )
+        else:
+            return None, Value.illegal_operation(self, other)
+
+    def get_comparison_eq(self, other):
+        if isinstance(other, String):
+            return Number(int(self.value == other.value)).set_context(self.context), None
+        else:
+            return None, Value.illegal_operation(self, other)
+
+    def get_comparison_ne(self, other):
+        if isinstance(other, String):
+            return Number(int(self.value != other.value)).set_context(self.context), None
+        else:
+            return None, Value.illegal_operation(self, other)
+
+    def get_comparison_lt(self, other):
+        if isinstance(other, String):
+            return Number(int(self.value < other.value)).set_context(self.context), None
+        else:
+            return None, Value.illegal_operation(self, other)
+
+    def get_comparison_gt(self, other):
+        if isinstance(other, String):
+            return Number(int(self.value > other.value)).set_context(self.context), None
+        else:
+            return None, Value.illegal_operation(self, other)
+
+    def get_comparison_lte(self, other):
+        if isinstance(other, String):
+            return Number(int(self.value <= other.value)).set_context(self.context), None
+        else:
+            return None, Value.illegal_operation(self, other)
+
+    def get_comparison_gte(self, other):
+        if isinstance(other, String):
+            return Number(int(self.value >= other.value)).set_context(self.context), None
+        else:
+            return None, Value.illegal_operation(self, other)
+
+    def iterate(self):
+        return map(String, self.value), None
+
+    def is_true(self):
+        return len(self.value) > 0
+
+    def hash_key(self):
+        return self.value
+
+    def copy(self):
+        copy = String(self.value)
+        copy.set_pos(self.pos_start, self.pos_end)
+        copy.set_context(self.context)
+        return copy
+
+    def __str__(self):
+        return self.value
+
+    def __repr__(self):
+        return f'"{self.value}"'
+
+class List(Value):
+    def __init__(self, elements):
+        super().__init__()
+        self.elements = elements
+
+    def added_to(self, other):
+        new_list = self.copy()
+        new_list.elements.append(other)
+        return new_list, None
+
+    def subbed_by(self, other):
+        if isinstance(other, Number):
+            new_list = self.copy()
             try:
                 new_list.elements.pop(other.value)
                 return new_list, None
@@ -1560,7 +2387,7 @@ class List(Value):
     def dived_by(self, other):
         if isinstance(other, Number):
             try:
-                return self.elements[other.value], None
+                return self.elements[other.value].copy(), None
             except:
                 return None, RTError(
                     other.pos_start, other.pos_end,
@@ -1570,6 +2397,9 @@ class List(Value):
         else:
             return None, Value.illegal_operation(self, other)
     
+    def iterate(self):
+        return iter(self.elements), None
+
     def copy(self):
         copy = List(self.elements)
         copy.set_pos(self.pos_start, self.pos_end)
@@ -1582,6 +2412,276 @@ class List(Value):
     def __repr__(self):
         return f'[{", ".join([repr(x) for x in self.elements])}]'
 
+class Map(Value):
+    def __init__(self, entries):
+        super().__init__()
+        # hash key -> (key, value), so the original key values can be given back
+        self.entries = entries
+
+    def dived_by(self, other):
+        entry = self.entries.get(other.hash_key())
+        if entry is None:
+            return None, RTError(
+                other.pos_start, other.pos_end,
+                'key could not be found in map',
+                self.context
+            )
+        return entry[1].copy(), None
+
+    def is_true(self):
+        return len(self.entries) > 0
+
+    # iterates over a snapshot of the keys, so the map can be changed inside the loop
+    def iterate(self):
+        return iter([key for key, _ in self.entries.values()]), None
+
+    def copy(self):
+        copy = Map(self.entries)
+        copy.set_pos(self.pos_start, self.pos_end)
+        copy.set_context(self.context)
+        return copy
+
+    def __str__(self):
+        return ", ".join([f'{key}: {value}' for key, value in self.entries.values()])
+
+    def __repr__(self):
+        return f'{{{", ".join([f"{key!r}: {value!r}" for key, value in self.entries.values()])}}}'
+
+class Set(Value):
+    def __init__(self, elements):
+        super().__init__()
+        # hash key -> element, a dict keeps the insertion order stable
+        self.elements = elements
+
+    def is_true(self):
+        return len(self.elements) > 0
+
+    def iterate(self):
+        return iter(list(self.elements.values())), None
+
+    def copy(self):
+        copy = Set(self.elements)
+        copy.set_pos(self.pos_start, self.pos_end)
+        copy.set_context(self.context)
+        return copy
+
+    def __str__(self):
+        return ", ".join([str(x) for x in self.elements.values()])
+
+    def __repr__(self):
+        if not self.elements: return 'set([])'
+        return f'{{{", ".join([repr(x) for x in self.elements.values()])}}}'
+
+class Deque(Value):
+    def __init__(self, elements):
+        super().__init__()
+        self.elements = elements
+
+    def is_true(self):
+        return len(self.elements) > 0
+
+    def iterate(self):
+        return iter(list(self.elements)), None
+
+    def copy(self):
+        copy = Deque(self.elements)
+        copy.set_pos(self.pos_start, self.pos_end)
+        copy.set_context(self.context)
+        return copy
+
+    def __str__(self):
+        return ", ".join([str(x) for x in self.elements])
+
+    def __repr__(self):
+        return f'deque([{", ".join([repr(x) for x in self.elements])}])'
+
+class PriorityQueue(Value):
+    def __init__(self, heap, counter=None):
+        super().__init__()
+        # heapq ordered list of (priority, insertion count, value)
+        self.heap = heap
+        # breaks ties between equal priorities so the heap never compares the values themselves
+        self.counter = counter or itertools.count()
+
+    def push(self, priority, value):
+        heapq.heappush(self.heap, (priority, next(self.counter), value))
+
+    def pop(self):
+        return heapq.heappop(self.heap)[2]
+
+    def is_true(self):
+        return len(self.heap) > 0
+
+    def copy(self):
+        copy = PriorityQueue(self.heap, self.counter)
+        copy.set_pos(self.pos_start, self.pos_end)
+        copy.set_context(self.context)
+        return copy
+
+    def __repr__(self):
+        return f'<priority queue of {len(self.heap)}>'
+
+class Range(Value):
+    def __init__(self, start, end, step):
+        super().__init__()
+        self.start = start
+        self.end = end
+        self.step = step
+
+    def dived_by(self, other):
+        if isinstance(other, Number) and isinstance(other.value, int) and 0 <= other.value < self.length():
+            return Number(self.start + other.value * self.step).set_context(self.context), None
+        elif isinstance(other, Number):
+            return None, RTError(
+                other.pos_start, other.pos_end,
+                'element at this index could not be retrieved from range because index is out of bounds',
+                self.context
+            )
+        else:
+            return None, Value.illegal_operation(self, other)
+
+    def length(self):
+        return max(0, math.ceil((self.end - self.start) / self.step))
+
+    def iterate(self):
+        if isinstance(self.start, int) and isinstance(self.end, int) and isinstance(self.step, int):
+            return map(Number, range(self.start, self.end, self.step)), None
+        return self.produce(), None
+
+    def produce(self):
+        for i in range(self.length()):
+            yield Number(self.start + i * self.step)
+
+    def is_true(self):
+        return self.length() > 0
+
+    def copy(self):
+        copy = Range(self.start, self.end, self.step)
+        copy.set_pos(self.pos_start, self.pos_end)
+        copy.set_context(self.context)
+        return copy
+
+    def __repr__(self):
+        return f'range({self.start}, {self.end}, {self.step})'
+
+class Generator(Value):
+    def __init__(self, name, steps):
+        super().__init__()
+        self.name = name
+        # python generator running the function body, see ResumableEvaluator.generate
+        self.steps = steps
+
+    def iterate(self):
+        return self.produce(), None
+
+    def produce(self):
+        while True:
+            try:
+                value = next(self.steps)
+            except StopIteration as stop:
+                if stop.value and stop.value.error: yield stop.value.error
+                return
+            yield value
+
+    def is_true(self):
+        return True
+
+    def copy(self):
+        copy = Generator(self.name, self.steps)
+        copy.set_pos(self.pos_start, self.pos_end)
+        copy.set_context(self.context)
+        return copy
+
+    def __repr__(self):
+        return f'<generator {self.name}>'
+
+class File(Value):
+    def __init__(self, name, file, close_when_done=False):
+        super().__init__()
+        self.name = name
+        self.file = file
+        # files opened by read_lines() close themselves once every line has been read
+        self.close_when_done = close_when_done
+
+    def iterate(self):
+        return self.produce(), None
+
+    def produce(self):
+        try:
+            for line in self.file:
+                yield String(line[:-1] if line.endswith('\n') else line)
+        # unsupported operation is a value error too, so it has to be caught first
+        except io.UnsupportedOperation:
+            yield RTError(
+                self.pos_start, self.pos_end,
+                'file is not open for reading',
+                self.context
+            )
+        except ValueError:
+            yield RTError(
+                self.pos_start, self.pos_end,
+                'file is closed',
+                self.context
+            )
+
+        if self.close_when_done:
+            self.file.close()
+
+    def is_true(self):
+        return True
+
+    def copy(self):
+        copy = File(self.name, self.file, self.close_when_done)
+        copy.set_pos(self.pos_start, self.pos_end)
+        copy.set_context(self.context)
+        return copy
+
+    def __repr__(self):
+        return f'<file {self.name}>'
+
+class Channel(Value):
+    def __init__(self, values=None, waiting=None):
+        super().__init__()
+        self.values = values if values is not None else deque()
+        # tasks suspended until a value is sent
+        self.waiting = waiting if waiting is not None else deque()
+
+    def is_true(self):
+        return True
+
+    def copy(self):
+        copy = Channel(self.values, self.waiting)
+        copy.set_pos(self.pos_start, self.pos_end)
+        copy.set_context(self.context)
+        return copy
+
+    def __repr__(self):
+        return f'<channel of {len(self.values)}>'
+
+class Task(Value):
+    def __init__(self, name, steps):
+        super().__init__()
+        self.name = name
+        # python generator running the call on a ResumableEvaluator, see Scheduler
+        self.steps = steps
+        # sent to the task when it next runs, the result of what it was waiting for
+        self.resume_value = None
+        # channel the task is waiting on, and the result of the call once it has finished
+        self.channel = None
+        self.result = None
+
+    def is_true(self):
+        return True
+
+    def copy(self):
+        copy = Task(self.name, self.steps)
+        copy.set_pos(self.pos_start, self.pos_end)
+        copy.set_context(self.context)
+        return copy
+
+    def __repr__(self):
+        return f'<task {self.name}>'
+
 class BaseFunction(Value):
     def __init__(self, name):
         super().__init__()
@@ -1614,9 +2714,7 @@ class BaseFunction(Value):
     def populate_args(self, arg_names, args, exec_ctx):
         for i in range(len(args)):
             arg_name = arg_names[i]
-            arg_value = args[i]
-            arg_value.set_context(exec_ctx)
-            exec_ctx.symbol_table.set(arg_name, arg_value)
+            exec_ctx.symbol_table.set(arg_name, args[i])
 
     def check_and_populate_args(self, arg_names, args, exec_ctx):
         res = RTResult()
@@ -1626,28 +2724,39 @@ class BaseFunction(Value):
         return res.success(None)
 
 class Function(BaseFunction):
-    def __init__(self, name, body_node, arg_names, should_auto_return):
+    def __init__(self, name, body_node, arg_names, should_auto_return, is_generator=False):
         super().__init__(name)
         self.body_node = body_node
         self.arg_names = arg_names
         self.should_auto_return = should_auto_return
+        self.is_generator = is_generator
 
     def execute(self, args):
         res = RTResult()
-        interpreter = Interpreter()
         exec_ctx = self.generate_new_context()
+        interpreter = exec_ctx.interpreter
 
         res.register(self.check_and_populate_args(self.arg_names, args, exec_ctx))
         if res.should_return(): return res
 
+        # the body of a generator only runs as its values are asked for
+        if self.is_generator:
+            steps = ResumableEvaluator(interpreter).generate(self.body_node, exec_ctx)
+            return res.success(Generator(self.name, steps))
+
         value = res.register(interpreter.visit(self.body_node, exec_ctx))
+        exec_ctx.release()
+        return self.finish(res, value)
+
+    # result of the call once the body has been run, res holding the result of the body
+    def finish(self, res, value):
         if res.should_return() and res.func_return_value == None: return res
 
         ret_value = (value if self.should_auto_return else None) or res.func_return_value or Number.null
         return res.success(ret_value)
 
     def copy(self):
-        copy = Function(self.name, self.body_node, self.arg_names, self.should_auto_return)
+        copy = Function(self.name, self.body_node, self.arg_names, self.should_auto_return, self.is_generator)
         copy.set_context(self.context)
         copy.set_pos(self.pos_start, self.pos_end)
         return copy
@@ -1669,13 +2778,65 @@ class BuiltInFunction(BaseFunction):
         res.register(self.check_and_populate_args(method.arg_names, args, exec_ctx))
         if res.should_return(): return res
 
+        # a blocking builtin can't be stopped between steps while it waits, so the time
+        # budget is checked before it starts and again once it returns
+        blocks = getattr(method, 'blocks', False)
+        error = self.check_deadline(exec_ctx) if blocks else None
+        if error: return res.failure(error)
+
         return_value = res.register(method(exec_ctx))
+        error = self.check_deadline(exec_ctx) if blocks and not res.should_return() else None
+        if error: res.failure(error)
+        exec_ctx.release()
         if res.should_return(): return res
         return res.success(return_value)
     
     def no_visit_method(self, node, context):
         raise Exception(f'no execute_{self.name} method defined')
 
+    # builtins marked as blocking wait on the outside world, such as input or a file
+    def blocks(self):
+        method = getattr(self, f'execute_{self.name}', None)
+        return getattr(method, 'blocks', False)
+
+    def check_deadline(self, exec_ctx):
+        time_left = exec_ctx.interpreter.time_left()
+        if time_left is not None and time_left <= 0:
+            return self.time_budget_exhausted(exec_ctx)
+        return None
+
+    def time_budget_exhausted(self, exec_ctx):
+        return RTError(
+            self.pos_start, self.pos_end,
+            f'time budget of {exec_ctx.interpreter.timeout} seconds exhausted',
+            exec_ctx
+        )
+
+    # used by run_async() for blocking builtins, so waiting doesn't hold up the event loop.
+    # runs the builtin's asynchronous version if it has one, otherwise runs it on a thread
+    async def execute_async(self, args):
+        method = getattr(self, f'execute_{self.name}_async', None)
+        if method is None:
+            return await asyncio.get_running_loop().run_in_executor(None, self.execute, args)
+
+        res = RTResult()
+        exec_ctx = self.generate_new_context()
+
+        res.register(self.check_and_populate_args(method.arg_names, args, exec_ctx))
+        if res.should_return(): return res
+
+        return_value = res.register(await method(exec_ctx))
+        exec_ctx.release()
+        if res.should_return(): return res
+        return res.success(return_value)
+
+    # channel the call would have to wait on before it can run, so a task can be suspended
+    # until a value is sent instead of the call blocking
+    def waits_on(self, args):
+        if self.name == 'receive' and len(args) == 1 and isinstance(args[0], Channel) and not args[0].values:
+            return args[0]
+        return None
+
     def copy(self):
         copy = BuiltInFunction(self.name)
         copy.set_context(self.context)
@@ -1688,7 +2849,8 @@ class BuiltInFunction(BaseFunction):
     #####################################
 
     def execute_print(self, exec_ctx):
-        print(str(exec_ctx.symbol_table.get('value')))
+        exec_ctx.interpreter.output.write_value(exec_ctx.symbol_table.get('value'))
+        exec_ctx.interpreter.output.write('\n')
         return RTResult().success(Number.null)
     execute_print.arg_names = ['value']
     
@@ -1697,22 +2859,27 @@ class BuiltInFunction(BaseFunction):
     execute_print_ret.arg_names = ['value']
     
     def execute_input(self, exec_ctx):
+        exec_ctx.interpreter.output.flush()
         text = input()
         return RTResult().success(String(text))
     execute_input.arg_names = []
+    execute_input.blocks = True
 
     def execute_input_int(self, exec_ctx):
         while True:
+            exec_ctx.interpreter.output.flush()
             text = input()
             try:
                 number = int(text)
                 break
             except ValueError:
-                print(f"'{text}' must be an integer. try again!")
+                exec_ctx.interpreter.output.write(f"'{text}' must be an integer. try again!\n")
         return RTResult().success(Number(number))
     execute_input_int.arg_names = []
+    execute_input_int.blocks = True
 
     def execute_clear(self, exec_ctx):
+        exec_ctx.interpreter.output.flush()
         os.system('cls' if os.name == 'nt' else 'cls') 
         return RTResult().success(Number.null)
     execute_clear.arg_names = []
@@ -1806,14 +2973,26 @@ class BuiltInFunction(BaseFunction):
     def execute_len(self, exec_ctx):
         list_ = exec_ctx.symbol_table.get('list')
 
-        if not isinstance(list_, List):
-            return RTResult().failure(RTError(
-                self.pos_start, self.pos_end,
-                'argument must be list',
-                exec_ctx
-            ))
+        if isinstance(list_, (List, Set, Deque)):
+            return RTResult().success(Number(len(list_.elements)))
 
-        return RTResult().success(Number(len(list_.elements)))
+        if isinstance(list_, String):
+            return RTResult().success(Number(len(list_.value)))
+
+        if isinstance(list_, Map):
+            return RTResult().success(Number(len(list_.entries)))
+
+        if isinstance(list_, PriorityQueue):
+            return RTResult().success(Number(len(list_.heap)))
+
+        if isinstance(list_, Range):
+            return RTResult().success(Number(list_.length()))
+
+        return RTResult().failure(RTError(
+            self.pos_start, self.pos_end,
+            'argument must be string, list, map, set, deque, priority queue or range',
+            exec_ctx
+        ))
     execute_len.arg_names = ['list']
 
     def execute_run(self, exec_ctx):
@@ -1839,7 +3018,7 @@ class BuiltInFunction(BaseFunction):
                 exec_ctx
             ))
 
-        _, error = run(filename, script)
+        _, error = exec_ctx.interpreter.run(filename, script)
 
         if error:
             return RTResult().failure(RTError(
@@ -1853,347 +3032,3415 @@ class BuiltInFunction(BaseFunction):
 
     execute_run.arg_names = ['filename']
 
-BuiltInFunction.print       = BuiltInFunction('print')
-BuiltInFunction.print_ret   = BuiltInFunction('print_ret')
-BuiltInFunction.input       = BuiltInFunction('input')
-BuiltInFunction.input_int   = BuiltInFunction('input_int')
-BuiltInFunction.clear       = BuiltInFunction('clear')
-BuiltInFunction.is_number   = BuiltInFunction('is_number')
-BuiltInFunction.is_string   = BuiltInFunction('is_string')
-BuiltInFunction.is_list     = BuiltInFunction('is_list')
-BuiltInFunction.is_function = BuiltInFunction('is_function')
-BuiltInFunction.append      = BuiltInFunction('append')
-BuiltInFunction.pop         = BuiltInFunction('pop')
+    #####################################
+
+    def check_key(self, key, exec_ctx):
+        if key.hash_key() is None:
+            return RTError(
+                self.pos_start, self.pos_end,
+                'key must be number or string',
+                exec_ctx
+            )
+        return None
+
+    def execute_get(self, exec_ctx):
+        map_ = exec_ctx.symbol_table.get('map')
+        key = exec_ctx.symbol_table.get('key')
+
+        if not isinstance(map_, Map):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'first argument must be map',
+                exec_ctx
+            ))
+
+        error = self.check_key(key, exec_ctx)
+        if error: return RTResult().failure(error)
+
+        entry = map_.entries.get(key.hash_key())
+        if entry is None:
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'key could not be found in map',
+                exec_ctx
+            ))
+
+        return RTResult().success(entry[1])
+    execute_get.arg_names = ['map', 'key']
+
+    def execute_put(self, exec_ctx):
+        map_ = exec_ctx.symbol_table.get('map')
+        key = exec_ctx.symbol_table.get('key')
+        value = exec_ctx.symbol_table.get('value')
+
+        if not isinstance(map_, Map):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'first argument must be map',
+                exec_ctx
+            ))
+
+        error = self.check_key(key, exec_ctx)
+        if error: return RTResult().failure(error)
+
+        map_.entries[key.hash_key()] = (key, value)
+        return RTResult().success(Number.null)
+    execute_put.arg_names = ['map', 'key', 'value']
+
+    def execute_add(self, exec_ctx):
+        set_ = exec_ctx.symbol_table.get('set')
+        value = exec_ctx.symbol_table.get('value')
+
+        if not isinstance(set_, Set):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'first argument must be set',
+                exec_ctx
+            ))
+
+        error = self.check_key(value, exec_ctx)
+        if error: return RTResult().failure(error)
+
+        set_.elements[value.hash_key()] = value
+        return RTResult().success(Number.null)
+    execute_add.arg_names = ['set', 'value']
+
+    def execute_has(self, exec_ctx):
+        collection = exec_ctx.symbol_table.get('collection')
+        key = exec_ctx.symbol_table.get('key')
+
+        if isinstance(collection, Map):
+            keys = collection.entries
+        elif isinstance(collection, Set):
+            keys = collection.elements
+        else:
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'first argument must be map or set',
+                exec_ctx
+            ))
+
+        error = self.check_key(key, exec_ctx)
+        if error: return RTResult().failure(error)
+
+        return RTResult().success(Number.true if key.hash_key() in keys else Number.false)
+    execute_has.arg_names = ['collection', 'key']
+
+    def execute_remove(self, exec_ctx):
+        collection = exec_ctx.symbol_table.get('collection')
+        key = exec_ctx.symbol_table.get('key')
+
+        if isinstance(collection, Map):
+            keys = collection.entries
+        elif isinstance(collection, Set):
+            keys = collection.elements
+        else:
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'first argument must be map or set',
+                exec_ctx
+            ))
+
+        error = self.check_key(key, exec_ctx)
+        if error: return RTResult().failure(error)
+
+        if keys.pop(key.hash_key(), None) is None:
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'key could not be removed because it is not present',
+                exec_ctx
+            ))
+
+        return RTResult().success(Number.null)
+    execute_remove.arg_names = ['collection', 'key']
+
+    def execute_keys(self, exec_ctx):
+        map_ = exec_ctx.symbol_table.get('map')
+
+        if not isinstance(map_, Map):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'argument must be map',
+                exec_ctx
+            ))
+
+        return RTResult().success(List([key for key, _ in map_.entries.values()]))
+    execute_keys.arg_names = ['map']
+
+    def execute_values(self, exec_ctx):
+        map_ = exec_ctx.symbol_table.get('map')
+
+        if not isinstance(map_, Map):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'argument must be map',
+                exec_ctx
+            ))
+
+        return RTResult().success(List([value for _, value in map_.entries.values()]))
+    execute_values.arg_names = ['map']
+
+    def execute_set(self, exec_ctx):
+        list_ = exec_ctx.symbol_table.get('list')
+
+        if not isinstance(list_, List):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'argument must be list',
+                exec_ctx
+            ))
+
+        elements = {}
+        for element in list_.elements:
+            error = self.check_key(element, exec_ctx)
+            if error: return RTResult().failure(error)
+            elements[element.hash_key()] = element
+
+        return RTResult().success(Set(elements))
+    execute_set.arg_names = ['list']
+
+    #####################################
+
+    def check_strings(self, exec_ctx, *arg_names):
+        for i, arg_name in enumerate(arg_names):
+            if not isinstance(exec_ctx.symbol_table.get(arg_name), String):
+                ordinal = ('first', 'second', 'third')[i]
+                return RTError(
+                    self.pos_start, self.pos_end,
+                    f'{ordinal} argument must be string' if len(arg_names) > 1 else 'argument must be string',
+                    exec_ctx
+                )
+        return None
+
+    def execute_slice(self, exec_ctx):
+        value = exec_ctx.symbol_table.get('value')
+        start = exec_ctx.symbol_table.get('start')
+        end = exec_ctx.symbol_table.get('end')
+
+        if not isinstance(value, (String, List)):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'first argument must be string or list',
+                exec_ctx
+            ))
+
+        if not isinstance(start, Number) or not isinstance(end, Number) or not isinstance(start.value, int) or not isinstance(end.value, int):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'start and end must be integers',
+                exec_ctx
+            ))
+
+        if isinstance(value, String):
+            return RTResult().success(String(value.value[start.value:end.value]))
+        return RTResult().success(List(value.elements[start.value:end.value]))
+    execute_slice.arg_names = ['value', 'start', 'end']
+
+    def execute_split(self, exec_ctx):
+        error = self.check_strings(exec_ctx, 'string', 'separator')
+        if error: return RTResult().failure(error)
+
+        string_ = exec_ctx.symbol_table.get('string').value
+        # an empty separator splits on runs of whitespace
+        separator = exec_ctx.symbol_table.get('separator').value or None
+
+        return RTResult().success(List([String(part) for part in string_.split(separator)]))
+    execute_split.arg_names = ['string', 'separator']
+
+    def execute_find(self, exec_ctx):
+        error = self.check_strings(exec_ctx, 'string', 'substring')
+        if error: return RTResult().failure(error)
+
+        string_ = exec_ctx.symbol_table.get('string').value
+        substring = exec_ctx.symbol_table.get('substring').value
+
+        return RTResult().success(Number(string_.find(substring)))
+    execute_find.arg_names = ['string', 'substring']
+
+    def execute_replace(self, exec_ctx):
+        error = self.check_strings(exec_ctx, 'string', 'old', 'new')
+        if error: return RTResult().failure(error)
+
+        string_ = exec_ctx.symbol_table.get('string').value
+        old = exec_ctx.symbol_table.get('old').value
+        new = exec_ctx.symbol_table.get('new').value
+
+        return RTResult().success(String(string_.replace(old, new)))
+    execute_replace.arg_names = ['string', 'old', 'new']
+
+    def execute_upper(self, exec_ctx):
+        error = self.check_strings(exec_ctx, 'string')
+        if error: return RTResult().failure(error)
+        return RTResult().success(String(exec_ctx.symbol_table.get('string').value.upper()))
+    execute_upper.arg_names = ['string']
+
+    def execute_lower(self, exec_ctx):
+        error = self.check_strings(exec_ctx, 'string')
+        if error: return RTResult().failure(error)
+        return RTResult().success(String(exec_ctx.symbol_table.get('string').value.lower()))
+    execute_lower.arg_names = ['string']
+
+    def execute_trim(self, exec_ctx):
+        error = self.check_strings(exec_ctx, 'string')
+        if error: return RTResult().failure(error)
+        return RTResult().success(String(exec_ctx.symbol_table.get('string').value.strip()))
+    execute_trim.arg_names = ['string']
+
+    def execute_join(self, exec_ctx):
+        separator = exec_ctx.symbol_table.get('separator')
+        list_ = exec_ctx.symbol_table.get('list')
+
+        error = self.check_strings(exec_ctx, 'separator')
+        if error: return RTResult().failure(error)
+
+        if not isinstance(list_, List):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'second argument must be list',
+                exec_ctx
+            ))
+
+        return RTResult().success(String(separator.value.join([str(x) for x in list_.elements])))
+    execute_join.arg_names = ['separator', 'list']
+
+    def execute_to_number(self, exec_ctx):
+        error = self.check_strings(exec_ctx, 'string')
+        if error: return RTResult().failure(error)
+
+        text = exec_ctx.symbol_table.get('string').value
+
+        try:
+            number = int(text)
+        except ValueError:
+            try:
+                number = float(text)
+            except ValueError:
+                return RTResult().failure(RTError(
+                    self.pos_start, self.pos_end,
+                    f"'{text}' could not be converted to a number",
+                    exec_ctx
+                ))
+
+        return RTResult().success(Number(number))
+    execute_to_number.arg_names = ['string']
+
+    #####################################
+
+    # larger than the default buffer, so big reads and writes make fewer system calls
+    file_buffer_size = io.DEFAULT_BUFFER_SIZE * 8
+
+    def open_file(self, exec_ctx, filename, mode):
+        try:
+            # read_file() decodes files as utf-8 too, whatever the locale's encoding is
+            return open(filename, mode, buffering=self.file_buffer_size, encoding='utf-8'), None
+        except Exception as e:
+            return None, RTError(
+                self.pos_start, self.pos_end,
+                f"failed to open file \"{filename}\"\n" + str(e),
+                exec_ctx
+            )
+
+    def check_file(self, file, exec_ctx):
+        if not isinstance(file, File):
+            return RTError(
+                self.pos_start, self.pos_end,
+                'first argument must be file',
+                exec_ctx
+            )
+
+        if file.file.closed:
+            return RTError(
+                self.pos_start, self.pos_end,
+                'file is closed',
+                exec_ctx
+            )
+
+        return None
+
+    def execute_open(self, exec_ctx):
+        error = self.check_strings(exec_ctx, 'filename', 'mode')
+        if error: return RTResult().failure(error)
+
+        filename = exec_ctx.symbol_table.get('filename').value
+        mode = exec_ctx.symbol_table.get('mode').value
+
+        if mode not in ('r', 'w', 'a'):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                "mode must be \"r\", \"w\" or \"a\"",
+                exec_ctx
+            ))
+
+        file, error = self.open_file(exec_ctx, filename, mode)
+        if error: return RTResult().failure(error)
+
+        return RTResult().success(File(filename, file))
+    execute_open.arg_names = ['filename', 'mode']
+
+    def execute_read_line(self, exec_ctx):
+        file = exec_ctx.symbol_table.get('file')
+        error = self.check_file(file, exec_ctx)
+        if error: return RTResult().failure(error)
+
+        try:
+            line = file.file.readline()
+        except io.UnsupportedOperation:
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'file is not open for reading',
+                exec_ctx
+            ))
+
+        # null marks the end of the file, an empty line is still a string
+        if line == '': return RTResult().success(Number.null)
+        return RTResult().success(String(line[:-1] if line.endswith('\n') else line))
+    execute_read_line.arg_names = ['file']
+    execute_read_line.blocks = True
+
+    def execute_read_lines(self, exec_ctx):
+        error = self.check_strings(exec_ctx, 'filename')
+        if error: return RTResult().failure(error)
+
+        filename = exec_ctx.symbol_table.get('filename').value
+        file, error = self.open_file(exec_ctx, filename, 'r')
+        if error: return RTResult().failure(error)
+
+        return RTResult().success(File(filename, file, True))
+    execute_read_lines.arg_names = ['filename']
+
+    def execute_read_file(self, exec_ctx):
+        error = self.check_strings(exec_ctx, 'filename')
+        if error: return RTResult().failure(error)
+
+        filename = exec_ctx.symbol_table.get('filename').value
+
+        try:
+            with open(filename, 'rb') as f:
+                # empty files can't be memory mapped
+                if os.fstat(f.fileno()).st_size == 0:
+                    text = ''
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        text = str(mapped, 'utf-8')
+        except Exception as e:
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                f"failed to read file \"{filename}\"\n" + str(e),
+                exec_ctx
+            ))
+
+        return RTResult().success(String(text))
+    execute_read_file.arg_names = ['filename']
+    execute_read_file.blocks = True
+
+    def execute_read_stdin(self, exec_ctx):
+        return RTResult().success(String(sys.stdin.read()))
+    execute_read_stdin.arg_names = []
+    execute_read_stdin.blocks = True
+
+    def execute_write(self, exec_ctx):
+        file = exec_ctx.symbol_table.get('file')
+        error = self.check_file(file, exec_ctx)
+        if error: return RTResult().failure(error)
+
+        try:
+            file.file.write(str(exec_ctx.symbol_table.get('value')))
+        except io.UnsupportedOperation:
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'file is not open for writing',
+                exec_ctx
+            ))
+
+        return RTResult().success(Number.null)
+    execute_write.arg_names = ['file', 'value']
+
+    def execute_close(self, exec_ctx):
+        file = exec_ctx.symbol_table.get('file')
+
+        if not isinstance(file, File):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'argument must be file',
+                exec_ctx
+            ))
+
+        file.file.close()
+        return RTResult().success(Number.null)
+    execute_close.arg_names = ['file']
+
+    #####################################
+
+    def execute_range(self, exec_ctx):
+        bounds = [exec_ctx.symbol_table.get(name) for name in ('start', 'end', 'step')]
+
+        if not all(isinstance(bound, Number) for bound in bounds):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'arguments must be numbers',
+                exec_ctx
+            ))
+
+        start, end, step = [bound.value for bound in bounds]
+
+        if step == 0:
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'step must not be zero',
+                exec_ctx
+            ))
+
+        return RTResult().success(Range(start, end, step))
+    execute_range.arg_names = ['start', 'end', 'step']
+
+    def execute_list(self, exec_ctx):
+        iterable = exec_ctx.symbol_table.get('iterable')
+
+        iterator, error = iterable.iterate()
+        if error:
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'argument must be iterable',
+                exec_ctx
+            ))
+
+        elements = []
+        for element in iterator:
+            if isinstance(element, Error): return RTResult().failure(element)
+            elements.append(element)
+
+        return RTResult().success(List(elements))
+    execute_list.arg_names = ['iterable']
+
+    #####################################
+
+    def execute_deque(self, exec_ctx):
+        list_ = exec_ctx.symbol_table.get('list')
+
+        if not isinstance(list_, List):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'argument must be list',
+                exec_ctx
+            ))
+
+        return RTResult().success(Deque(deque(list_.elements)))
+    execute_deque.arg_names = ['list']
+
+    def check_deque(self, deque_, exec_ctx):
+        if not isinstance(deque_, Deque):
+            return RTError(
+                self.pos_start, self.pos_end,
+                'first argument must be deque',
+                exec_ctx
+            )
+        return None
+
+    def execute_push_front(self, exec_ctx):
+        deque_ = exec_ctx.symbol_table.get('deque')
+        error = self.check_deque(deque_, exec_ctx)
+        if error: return RTResult().failure(error)
+
+        deque_.elements.appendleft(exec_ctx.symbol_table.get('value'))
+        return RTResult().success(Number.null)
+    execute_push_front.arg_names = ['deque', 'value']
+
+    def execute_push_back(self, exec_ctx):
+        deque_ = exec_ctx.symbol_table.get('deque')
+        error = self.check_deque(deque_, exec_ctx)
+        if error: return RTResult().failure(error)
+
+        deque_.elements.append(exec_ctx.symbol_table.get('value'))
+        return RTResult().success(Number.null)
+    execute_push_back.arg_names = ['deque', 'value']
+
+    def execute_pop_front(self, exec_ctx):
+        deque_ = exec_ctx.symbol_table.get('deque')
+        error = self.check_deque(deque_, exec_ctx)
+        if error: return RTResult().failure(error)
+
+        if not deque_.elements:
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'cannot pop from an empty deque',
+                exec_ctx
+            ))
+
+        return RTResult().success(deque_.elements.popleft())
+    execute_pop_front.arg_names = ['deque']
+
+    def execute_pop_back(self, exec_ctx):
+        deque_ = exec_ctx.symbol_table.get('deque')
+        error = self.check_deque(deque_, exec_ctx)
+        if error: return RTResult().failure(error)
+
+        if not deque_.elements:
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'cannot pop from an empty deque',
+                exec_ctx
+            ))
+
+        return RTResult().success(deque_.elements.pop())
+    execute_pop_back.arg_names = ['deque']
+
+    def execute_priority_queue(self, exec_ctx):
+        return RTResult().success(PriorityQueue([]))
+    execute_priority_queue.arg_names = []
+
+    def execute_heap_push(self, exec_ctx):
+        queue = exec_ctx.symbol_table.get('queue')
+        priority = exec_ctx.symbol_table.get('priority')
+
+        if not isinstance(queue, PriorityQueue):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'first argument must be priority queue',
+                exec_ctx
+            ))
+
+        if not isinstance(priority, Number):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'second argument must be number',
+                exec_ctx
+            ))
+
+        queue.push(priority.value, exec_ctx.symbol_table.get('value'))
+        return RTResult().success(Number.null)
+    execute_heap_push.arg_names = ['queue', 'priority', 'value']
+
+    def execute_heap_pop(self, exec_ctx):
+        queue = exec_ctx.symbol_table.get('queue')
+
+        if not isinstance(queue, PriorityQueue):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'argument must be priority queue',
+                exec_ctx
+            ))
+
+        if not queue.heap:
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'cannot pop from an empty priority queue',
+                exec_ctx
+            ))
+
+        return RTResult().success(queue.pop())
+    execute_heap_pop.arg_names = ['queue']
+
+    #####################################
+
+    def apply_math(self, exec_ctx, func):
+        value = exec_ctx.symbol_table.get('value')
+
+        if not isinstance(value, Number):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'argument must be number',
+                exec_ctx
+            ))
+
+        try:
+            result = func(value.value)
+        except (ValueError, OverflowError) as e:
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                str(e),
+                exec_ctx
+            ))
+
+        return RTResult().success(Number(result))
+
+    def execute_sqrt(self, exec_ctx):
+        return self.apply_math(exec_ctx, math.sqrt)
+    execute_sqrt.arg_names = ['value']
+
+    def execute_floor(self, exec_ctx):
+        return self.apply_math(exec_ctx, math.floor)
+    execute_floor.arg_names = ['value']
+
+    def execute_ceil(self, exec_ctx):
+        return self.apply_math(exec_ctx, math.ceil)
+    execute_ceil.arg_names = ['value']
+
+    def execute_abs(self, exec_ctx):
+        return self.apply_math(exec_ctx, abs)
+    execute_abs.arg_names = ['value']
+
+    def execute_exp(self, exec_ctx):
+        return self.apply_math(exec_ctx, math.exp)
+    execute_exp.arg_names = ['value']
+
+    def execute_log(self, exec_ctx):
+        return self.apply_math(exec_ctx, math.log)
+    execute_log.arg_names = ['value']
+
+    def execute_sin(self, exec_ctx):
+        return self.apply_math(exec_ctx, math.sin)
+    execute_sin.arg_names = ['value']
+
+    def execute_cos(self, exec_ctx):
+        return self.apply_math(exec_ctx, math.cos)
+    execute_cos.arg_names = ['value']
+
+    def execute_min(self, exec_ctx):
+        a = exec_ctx.symbol_table.get('a')
+        b = exec_ctx.symbol_table.get('b')
+
+        if not isinstance(a, Number) or not isinstance(b, Number):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'arguments must be numbers',
+                exec_ctx
+            ))
+
+        return RTResult().success(Number(min(a.value, b.value)))
+    execute_min.arg_names = ['a', 'b']
+
+    def execute_max(self, exec_ctx):
+        a = exec_ctx.symbol_table.get('a')
+        b = exec_ctx.symbol_table.get('b')
+
+        if not isinstance(a, Number) or not isinstance(b, Number):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'arguments must be numbers',
+                exec_ctx
+            ))
+
+        return RTResult().success(Number(max(a.value, b.value)))
+    execute_max.arg_names = ['a', 'b']
+
+    def execute_random(self, exec_ctx):
+        return RTResult().success(Number(exec_ctx.interpreter.random_generator.random()))
+    execute_random.arg_names = []
+
+    def execute_random_seed(self, exec_ctx):
+        seed = exec_ctx.symbol_table.get('seed')
+
+        if not isinstance(seed, Number):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'argument must be number',
+                exec_ctx
+            ))
+
+        exec_ctx.interpreter.random_generator.seed(seed.value)
+        return RTResult().success(Number.null)
+    execute_random_seed.arg_names = ['seed']
+
+    #####################################
+
+    def execute_pmap(self, exec_ctx):
+        function = exec_ctx.symbol_table.get('function')
+        list_ = exec_ctx.symbol_table.get('list')
+        workers = exec_ctx.symbol_table.get('workers')
+
+        if not isinstance(function, BaseFunction):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'first argument must be function',
+                exec_ctx
+            ))
+
+        if not isinstance(list_, List):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'second argument must be list',
+                exec_ctx
+            ))
+
+        if not isinstance(workers, Number) or not isinstance(workers.value, int) or workers.value < 0:
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'third argument must be a non-negative integer',
+                exec_ctx
+            ))
+
+        if not list_.elements: return RTResult().success(List([]))
+
+        workers = workers.value or os.cpu_count() or 1
+        captures = capture_values(function, exec_ctx.parent.symbol_table)
+        size = -(-len(list_.elements) // (workers * 4))
+        chunks = [list_.elements[i:i + size] for i in range(0, len(list_.elements), size)]
+
+        try:
+            pool = get_pool(workers)
+            futures = [pool.submit(pmap_chunk, function, captures, chunk) for chunk in chunks]
+        except BrokenProcessPool as e:
+            drop_pool(workers)
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                f'a worker process stopped unexpectedly\n' + str(e),
+                exec_ctx
+            ))
+
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+                continue
+            except BrokenProcessPool as e:
+                drop_pool(workers)
+                message = f'a worker process stopped unexpectedly\n' + str(e)
+            except WorkerError as e:
+                message = f'a worker process failed\n' + str(e)
+            # values are pickled as they are sent, so failing to send them shows up here
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                message = f'failed to send values to worker processes\n' + str(e)
+            except Exception as e:
+                message = f'failed to receive values from worker processes\n' + str(e)
+
+            for future in futures: future.cancel()
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                message,
+                exec_ctx
+            ))
+
+        elements = []
+        for chunk_elements, error, printed in results:
+            # output printed by the workers comes out in order, as if the calls were made here
+            exec_ctx.interpreter.output.write(printed)
+
+            if error:
+                # continue the worker's traceback from the call to pmap
+                ctx = error.context
+                while ctx.parent: ctx = ctx.parent
+                ctx.parent = exec_ctx
+                ctx.parent_entry_pos = self.pos_start
+                return RTResult().failure(error)
+            elements.extend(chunk_elements)
+
+        return RTResult().success(List(elements))
+    execute_pmap.arg_names = ['function', 'list', 'workers']
+
+    #####################################
+
+    def execute_spawn(self, exec_ctx):
+        function = exec_ctx.symbol_table.get('function')
+        args = exec_ctx.symbol_table.get('args')
+
+        if not isinstance(function, BaseFunction):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'first argument must be function',
+                exec_ctx
+            ))
+
+        if not isinstance(args, List):
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'second argument must be list',
+                exec_ctx
+            ))
+
+        # the task starts after this call, and maybe its caller, has finished
+        function = function.copy().set_pos(self.pos_start, self.pos_end).set_context(exec_ctx.parent.retain())
+        return RTResult().success(exec_ctx.interpreter.scheduler.spawn(function, list(args.elements), exec_ctx))
+    execute_spawn.arg_names = ['function', 'args']
+
+    def execute_channel(self, exec_ctx):
+        return RTResult().success(Channel())
+    execute_channel.arg_names = []
+
+    def check_channel(self, channel, exec_ctx):
+        if not isinstance(channel, Channel):
+            return RTError(
+                self.pos_start, self.pos_end,
+                'first argument must be channel',
+                exec_ctx
+            )
+        return None
+
+    def execute_send(self, exec_ctx):
+        channel = exec_ctx.symbol_table.get('channel')
+        value = exec_ctx.symbol_table.get('value')
+
+        error = self.check_channel(channel, exec_ctx)
+        if error: return RTResult().failure(error)
+
+        channel.values.append(value)
+        if channel.waiting:
+            exec_ctx.interpreter.scheduler.ready.append(channel.waiting.popleft())
+        return RTResult().success(Number.null)
+    execute_send.arg_names = ['channel', 'value']
+
+    def execute_receive(self, exec_ctx):
+        channel = exec_ctx.symbol_table.get('channel')
+
+        error = self.check_channel(channel, exec_ctx)
+        if error: return RTResult().failure(error)
+
+        # tasks running on the resumable evaluator are suspended before getting here, anything
+        # else waiting on an empty channel runs the other tasks until one sends a value
+        if not channel.values:
+            error = exec_ctx.interpreter.scheduler.run_until(lambda: channel.values)
+            if error: return RTResult().failure(error)
+
+        if not channel.values:
+            return RTResult().failure(RTError(
+                self.pos_start, self.pos_end,
+                'channel is empty and no task is left to send to it',
+                exec_ctx
+            ))
+
+        return RTResult().success(channel.values.popleft())
+    execute_receive.arg_names = ['channel']
+
+    def check_seconds(self, seconds, exec_ctx):
+        if not isinstance(seconds, Number) or seconds.value < 0:
+            return RTError(
+                self.pos_start, self.pos_end,
+                'argument must be a non-negative number',
+                exec_ctx
+            )
+        return None
+
+    def execute_sleep(self, exec_ctx):
+        seconds = exec_ctx.symbol_table.get('seconds')
+
+        error = self.check_seconds(seconds, exec_ctx)
+        if error: return RTResult().failure(error)
+
+        exec_ctx.interpreter.output.flush()
+
+        # a sleep running past the time budget only waits until the budget runs out
+        time_left = exec_ctx.interpreter.time_left()
+        if time_left is not None and seconds.value > time_left:
+            time.sleep(max(time_left, 0))
+            return RTResult().failure(self.time_budget_exhausted(exec_ctx))
+
+        time.sleep(seconds.value)
+        return RTResult().success(Number.null)
+    execute_sleep.arg_names = ['seconds']
+    execute_sleep.blocks = True
+
+    async def execute_sleep_async(self, exec_ctx):
+        seconds = exec_ctx.symbol_table.get('seconds')
+
+        error = self.check_seconds(seconds, exec_ctx)
+        if error: return RTResult().failure(error)
+
+        await asyncio.sleep(seconds.value)
+        return RTResult().success(Number.null)
+    execute_sleep_async.arg_names = ['seconds']
+
+BuiltInFunction.print       = BuiltInFunction('print')
+BuiltInFunction.print_ret   = BuiltInFunction('print_ret')
+BuiltInFunction.input       = BuiltInFunction('input')
+BuiltInFunction.input_int   = BuiltInFunction('input_int')
+BuiltInFunction.clear       = BuiltInFunction('clear')
+BuiltInFunction.is_number   = BuiltInFunction('is_number')
+BuiltInFunction.is_string   = BuiltInFunction('is_string')
+BuiltInFunction.is_list     = BuiltInFunction('is_list')
+BuiltInFunction.is_function = BuiltInFunction('is_function')
+BuiltInFunction.append      = BuiltInFunction('append')
+BuiltInFunction.pop         = BuiltInFunction('pop')
 BuiltInFunction.extend      = BuiltInFunction('extend')
 BuiltInFunction.len         = BuiltInFunction('len')
 BuiltInFunction.run         = BuiltInFunction('run')
+BuiltInFunction.get         = BuiltInFunction('get')
+BuiltInFunction.put         = BuiltInFunction('put')
+BuiltInFunction.add         = BuiltInFunction('add')
+BuiltInFunction.has         = BuiltInFunction('has')
+BuiltInFunction.remove      = BuiltInFunction('remove')
+BuiltInFunction.keys        = BuiltInFunction('keys')
+BuiltInFunction.values      = BuiltInFunction('values')
+BuiltInFunction.set         = BuiltInFunction('set')
+BuiltInFunction.slice       = BuiltInFunction('slice')
+BuiltInFunction.split       = BuiltInFunction('split')
+BuiltInFunction.find        = BuiltInFunction('find')
+BuiltInFunction.replace     = BuiltInFunction('replace')
+BuiltInFunction.upper       = BuiltInFunction('upper')
+BuiltInFunction.lower       = BuiltInFunction('lower')
+BuiltInFunction.trim        = BuiltInFunction('trim')
+BuiltInFunction.join        = BuiltInFunction('join')
+BuiltInFunction.to_number   = BuiltInFunction('to_number')
+BuiltInFunction.open        = BuiltInFunction('open')
+BuiltInFunction.read_line   = BuiltInFunction('read_line')
+BuiltInFunction.read_lines  = BuiltInFunction('read_lines')
+BuiltInFunction.read_file   = BuiltInFunction('read_file')
+BuiltInFunction.read_stdin  = BuiltInFunction('read_stdin')
+BuiltInFunction.write       = BuiltInFunction('write')
+BuiltInFunction.close       = BuiltInFunction('close')
+BuiltInFunction.range       = BuiltInFunction('range')
+BuiltInFunction.list        = BuiltInFunction('list')
+BuiltInFunction.deque       = BuiltInFunction('deque')
+BuiltInFunction.push_front  = BuiltInFunction('push_front')
+BuiltInFunction.push_back   = BuiltInFunction('push_back')
+BuiltInFunction.pop_front   = BuiltInFunction('pop_front')
+BuiltInFunction.pop_back    = BuiltInFunction('pop_back')
+BuiltInFunction.priority_queue = BuiltInFunction('priority_queue')
+BuiltInFunction.heap_push   = BuiltInFunction('heap_push')
+BuiltInFunction.heap_pop    = BuiltInFunction('heap_pop')
+BuiltInFunction.sqrt        = BuiltInFunction('sqrt')
+BuiltInFunction.floor       = BuiltInFunction('floor')
+BuiltInFunction.ceil        = BuiltInFunction('ceil')
+BuiltInFunction.abs         = BuiltInFunction('abs')
+BuiltInFunction.exp         = BuiltInFunction('exp')
+BuiltInFunction.log         = BuiltInFunction('log')
+BuiltInFunction.sin         = BuiltInFunction('sin')
+BuiltInFunction.cos         = BuiltInFunction('cos')
+BuiltInFunction.min         = BuiltInFunction('min')
+BuiltInFunction.max         = BuiltInFunction('max')
+BuiltInFunction.random      = BuiltInFunction('random')
+BuiltInFunction.random_seed = BuiltInFunction('random_seed')
+BuiltInFunction.pmap        = BuiltInFunction('pmap')
+BuiltInFunction.spawn       = BuiltInFunction('spawn')
+BuiltInFunction.channel     = BuiltInFunction('channel')
+BuiltInFunction.send        = BuiltInFunction('send')
+BuiltInFunction.receive     = BuiltInFunction('receive')
+BuiltInFunction.sleep       = BuiltInFunction('sleep')
+
+#######################################
+#              context
+#######################################
+
+class Context:
+    def __init__(self, display_name, parent=None, parent_entry_pos=None):
+        self.display_name = display_name
+        self.parent = parent
+        self.parent_entry_pos = parent_entry_pos
+        self.symbol_table = None
+        # the interpreter running this context, shared with every context created from it
+        self.interpreter = parent.interpreter if parent else None
+
+    # only what a traceback needs is pickled, so errors can be sent back from worker processes
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['symbol_table'] = None
+        state['interpreter'] = None
+        return state
+
+    # drops the scope of a call that has finished. values only keep their context to build
+    # tracebacks, so the frame's symbols can be freed while values made in it are still around
+    def release(self):
+        self.symbol_table = None
+
+    # the same scope in a context that isn't released along with this one, for calls that
+    # start after the frame that made them has finished, such as spawned tasks
+    def retain(self):
+        context = Context(self.display_name, self.parent, self.parent_entry_pos)
+        context.symbol_table = self.symbol_table
+        context.interpreter = self.interpreter
+        return context
+
+#######################################
+#           symbol table
+#######################################
+
+class SymbolTable:
+    def __init__(self, parent=None):
+        self.symbols = {}
+        self.parent = parent
+
+    def get(self, name):
+        # scopes chain back through every call, so the chain is walked without recursing
+        table = self
+        value = table.symbols.get(name, None)
+        while value == None and table.parent:
+            table = table.parent
+            value = table.symbols.get(name, None)
+        return value
+
+    def set(self, name, value):
+        self.symbols[name] = value
+
+    def remove(self, name):
+        del self.symbols[name]
+
+#######################################
+#           interpreter
+#######################################
+
+class Interpreter:
+    # an interpreter owns its globals, output, random generator and hooks, so separate
+    # interpreters can run scripts side by side, including on different threads
+    def __init__(self, output=None, max_depth=10000, jit_threshold=None):
+        self.output = output or Output()
+        # how many calls deep the stack engine lets a program go
+        self.max_depth = max_depth
+        self.random_generator = random.Random()
+        self.global_symbol_table = SymbolTable()
+        populate_global_symbol_table(self.global_symbol_table)
+
+        # tracing hooks, keyed by event name. 'call', 'return' and 'error' fire around
+        # function calls, 'visit' fires before every node visit
+        self.hooks = {
+            'call': [],
+            'return': [],
+            'error': [],
+            'visit': []
+        }
+        # only true while a call, return or error hook is installed
+        self.tracing = False
+        # runs the tasks started with spawn()
+        self.scheduler = Scheduler(self)
+        self.set_budget()
+
+        # used by the closure engine, the instrumented one while visit hooks or budgets are set
+        self.closure_compiler = ClosureCompiler(self)
+        self.instrumented_closure_compiler = ClosureCompiler(self, instrumented=True)
+        # functions called jit_threshold times are translated to python, if they can be
+        self.transpiler = Transpiler(self, jit_threshold) if jit_threshold is not None else None
+
+    def visit(self, node, context):
+        method_name = f'visit_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_visit_method)
+        return method(node, context)
+
+    untraced_visit = visit
+
+    def traced_visit(self, node, context):
+        for hook in self.hooks['visit']:
+            hook(node, context)
+        return self.untraced_visit(node, context)
+
+    def budgeted_visit(self, node, context):
+        error = self.spend_step(node, context)
+        if error: return RTResult().failure(error)
+        return self.unbudgeted_visit(node, context)
+
+    def add_hook(self, event, callback):
+        if event not in self.hooks:
+            raise Exception(f"unknown hook event '{event}'")
+
+        self.hooks[event].append(callback)
+        self.update_tracing()
+
+    def remove_hook(self, event, callback):
+        self.hooks[event].remove(callback)
+        self.update_tracing()
+
+    def update_tracing(self):
+        # visit hooks swap in the traced visit method, so an untraced run never pays for them.
+        # budgets do the same with the budgeted visit method
+        self.unbudgeted_visit = self.traced_visit if self.hooks['visit'] else self.untraced_visit
+        self.visit = self.budgeted_visit if self.budgeted else self.unbudgeted_visit
+        self.tracing = bool(self.hooks['call'] or self.hooks['return'] or self.hooks['error'])
+
+    # limits on the number of nodes visited and the time taken by the current run. a run
+    # with steps to pause at is paused once it has taken that many steps, see Execution
+    def set_budget(self, max_steps=None, timeout=None, pause_at=None, steps=0):
+        self.steps = steps
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.deadline = time.perf_counter() + timeout if timeout is not None else None
+        self.pause_at = pause_at
+        self.budgeted = max_steps is not None or timeout is not None or pause_at is not None
+        self.update_tracing()
+
+    def spend_step(self, node, context):
+        self.steps += 1
+
+        if self.max_steps is not None and self.steps > self.max_steps:
+            return RTError(
+                node.pos_start, node.pos_end,
+                f'step budget of {self.max_steps} exhausted',
+                context
+            )
+
+        # the clock is only read every so many steps to keep counting cheap
+        if self.deadline is not None and self.steps % 1000 == 0 and time.perf_counter() > self.deadline:
+            return RTError(
+                node.pos_start, node.pos_end,
+                f'time budget of {self.timeout} seconds exhausted',
+                context
+            )
+
+        return None
+
+    # seconds until the time budget runs out, None without one
+    def time_left(self):
+        return self.deadline - time.perf_counter() if self.deadline is not None else None
+
+    def should_pause(self):
+        return self.pause_at is not None and self.steps >= self.pause_at
+
+    ###################################
+
+    # optimize rewrites the tree with Optimizer before it is run
+    def compile(self, fn, text, pooled=False, optimize=False):
+        # generate tokens
+        lexer = Lexer(fn, text)
+        tokens, error = lexer.make_tokens()
+        if error: return None, error
+
+        # generate abstract syntax tree
+        parser = Parser(tokens)
+        ast = parser.parse()
+        if ast.error: return None, ast.error
+
+        node = Optimizer().optimize(ast.node) if optimize else ast.node
+        return Program(self, fn, node, pooled), None
+
+    # engine is 'tree' to visit the program recursively, 'stack' to run it on a resumable
+    # evaluator, which keeps its own stack and so can recurse much deeper, or 'closure' to
+    # compile it into python closures first, which runs faster
+    def run(self, fn, text, max_steps=None, timeout=None, engine='tree', optimize=False):
+        program, error = self.compile(fn, text, optimize=optimize)
+        if error: return None, error
+
+        # run program
+        result = program.run_with(self.global_symbol_table, max_steps, timeout, engine)
+        return result.value, result.error
+
+    # starts a run that can be paused and resumed, see Execution
+    def start(self, fn, text, max_steps=None):
+        program, error = self.compile(fn, text)
+        if error: return None, error
+
+        return Execution(program, self.global_symbol_table, max_steps), None
+
+    async def run_async(self, fn, text):
+        program, error = self.compile(fn, text)
+        if error: return None, error
+
+        result = await program.run_async_with(self.global_symbol_table)
+        return result.value, result.error
+
+    def traced_execute(self, value_to_call, args, context):
+        self.call_hooks(value_to_call, args, context)
+        res = value_to_call.execute(args)
+        self.result_hooks(value_to_call, res, context)
+        return res
+
+    def call_hooks(self, value_to_call, args, context):
+        for hook in self.hooks['call']:
+            hook(value_to_call, args, context)
+
+    def result_hooks(self, value_to_call, res, context):
+        if res.error:
+            for hook in self.hooks['error']:
+                hook(value_to_call, res.error, context)
+        else:
+            for hook in self.hooks['return']:
+                hook(value_to_call, res.value, context)
+
+    def no_visit_method(self, node, context):
+        raise Exception(f'no visit_{type(node).__name__} method defined')
+
+    ###################################
+
+    def visit_NumberNode(self, node, context):
+        return RTResult().success(
+            Number(node.tok.value).set_context(context).set_pos(node.pos_start, node.pos_end)
+        )
+
+    def visit_StringNode(self, node, context):
+        return RTResult().success(
+            String(node.tok.value).set_context(context).set_pos(node.pos_start, node.pos_end)
+        )
+
+    def visit_ListNode(self, node, context):
+        res = RTResult()
+        elements = []
+
+        for element_node in node.element_nodes:
+            elements.append(res.register(self.visit(element_node, context)))
+            if res.should_return(): return res
+
+        return res.success(
+            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
+        )
+
+    def visit_MapNode(self, node, context):
+        res = RTResult()
+        entries = {}
+
+        for key_node, value_node in node.entry_nodes:
+            key = res.register(self.visit(key_node, context))
+            if res.should_return(): return res
+
+            value = res.register(self.visit(value_node, context))
+            if res.should_return(): return res
+
+            hash_key = key.hash_key()
+            if hash_key is None:
+                return res.failure(RTError(
+                    key_node.pos_start, key_node.pos_end,
+                    'key must be number or string',
+                    context
+                ))
+
+            entries[hash_key] = (key, value)
+
+        return res.success(
+            Map(entries).set_context(context).set_pos(node.pos_start, node.pos_end)
+        )
+
+    def visit_SetNode(self, node, context):
+        res = RTResult()
+        elements = {}
+
+        for element_node in node.element_nodes:
+            element = res.register(self.visit(element_node, context))
+            if res.should_return(): return res
+
+            hash_key = element.hash_key()
+            if hash_key is None:
+                return res.failure(RTError(
+                    element_node.pos_start, element_node.pos_end,
+                    'element must be number or string',
+                    context
+                ))
+
+            elements[hash_key] = element
+
+        return res.success(
+            Set(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
+        )
+
+    def visit_VarAccessNode(self, node, context):
+        res = RTResult()
+        var_name = node.var_name_tok.value
+        value = context.symbol_table.get(var_name)
+
+        if not value:
+            return res.failure(RTError(
+                node.pos_start, node.pos_end,
+                f"'{var_name}' is not defined",
+                context
+            ))
+
+        value = value.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
+        return res.success(value)
+
+    def visit_VarAssignNode(self, node, context):
+        res = RTResult()
+        var_name = node.var_name_tok.value
+        value = res.register(self.visit(node.value_node, context))
+        if res.should_return(): return res
+
+        context.symbol_table.set(var_name, value)
+        return res.success(value)
+
+    def visit_BinOpNode(self, node, context):
+        res = RTResult()
+        left = res.register(self.visit(node.left_node, context))
+        if res.should_return(): return res
+
+        short_circuit = self.short_circuit(node, left, context)
+        if short_circuit: return res.success(short_circuit)
+
+        right = res.register(self.visit(node.right_node, context))
+        if res.should_return(): return res
+
+        return self.binary_operation(node, left, right)
+
+    # short-circuit 'and'/'or' when the left side already decides the result
+    def short_circuit(self, node, left, context):
+        if node.op_tok.type == tt_keyword and isinstance(left, Number):
+            if node.op_tok.value == 'and' and not left.is_true():
+                return Number(0).set_context(context).set_pos(node.pos_start, node.pos_end)
+            if node.op_tok.value == 'or' and left.is_true():
+                return Number(int(left.value)).set_context(context).set_pos(node.pos_start, node.pos_end)
+        return None
+
+    def binary_operation(self, node, left, right):
+        res = RTResult()
+        left_type, right_type = type(left), type(right)
+
+        # operands of the same types as the node last saw reuse the operation found for them
+        cache = node.cache
+        if cache is None or cache[0] is not left_type or cache[1] is not right_type:
+            number_operation = Number.operations.get(node.method_name) if left_type is Number and right_type is Number else None
+            cache = node.cache = (left_type, right_type, number_operation, getattr(left_type, node.method_name))
+
+        # two numbers skip the value methods, unless dividing by zero
+        if cache[2]:
+            try:
+                result = Number(cache[2](left.value, right.value))
+            except ZeroDivisionError:
+                pass
+            else:
+                result.context = left.context
+                result.pos_start, result.pos_end = node.pos_start, node.pos_end
+                return res.success(result)
+
+        result, error = cache[3](left, right)
+
+        if error:
+            return res.failure(error)
+        else:
+            return res.success(result.set_pos(node.pos_start, node.pos_end))
+
+    def visit_UnaryOpNode(self, node, context):
+        res = RTResult()
+        number = res.register(self.visit(node.node, context))
+        if res.should_return(): return res
+
+        return self.unary_operation(node, number)
+
+    def unary_operation(self, node, number):
+        res = RTResult()
+        error = None
+
+        if node.op_tok.type == tt_minus:
+            number, error = number.multed_by(Number(-1))
+        elif node.op_tok.matches(tt_keyword, 'not'):
+            number, error = number.notted()
+
+        if error:
+            return res.failure(error)
+        else:
+            return res.success(number.set_pos(node.pos_start, node.pos_end))
+
+    def visit_IfNode(self, node, context):
+        res = RTResult()
+
+        for condition, expr, should_return_null in node.cases:
+            condition_value = res.register(self.visit(condition, context))
+            if res.should_return(): return res
+
+            if condition_value.is_true():
+                expr_value = res.register(self.visit(expr, context))
+                if res.should_return(): return res
+                return res.success(Number.null if should_return_null else expr_value)
+
+        if node.else_case:
+            expr, should_return_null = node.else_case
+            expr_value = res.register(self.visit(expr, context))
+            if res.should_return(): return res
+            return res.success(Number.null if should_return_null else expr_value)
+
+        return res.success(Number.null)
+
+    def visit_ForNode(self, node, context):
+        res = RTResult()
+        elements = []
+
+        start_value = res.register(self.visit(node.start_value_node, context))
+        if res.should_return(): return res
+
+        end_value = res.register(self.visit(node.end_value_node, context))
+        if res.should_return(): return res
+
+        if node.step_value_node:
+            step_value = res.register(self.visit(node.step_value_node, context))
+            if res.should_return(): return res
+        else:
+            step_value = Number(1)
+
+        i = start_value.value
+
+        if step_value.value >= 0:
+            condition = lambda: i < end_value.value
+        else:
+            condition = lambda: i > end_value.value
+        
+        while condition():
+            context.symbol_table.set(node.var_name_tok.value, Number(i))
+            i += step_value.value
+
+            value = res.register(self.visit(node.body_node, context))
+            if res.should_return() and res.loop_should_continue == False and res.loop_should_break == False: return res
+            
+            if res.loop_should_continue:
+                continue
+            
+            if res.loop_should_break:
+                break
+
+            # block loops evaluate to null, so their values don't need to be kept
+            if not node.should_return_null: elements.append(value)
+
+        return res.success(
+            Number.null if node.should_return_null else
+            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
+        )
+
+    def visit_ForEachNode(self, node, context):
+        res = RTResult()
+        elements = []
+
+        iterable = res.register(self.visit(node.iterable_node, context))
+        if res.should_return(): return res
+
+        iterator, error = iterable.iterate()
+        if error: return res.failure(error)
+
+        var_name = node.var_name_tok.value
+        symbol_table = context.symbol_table
+
+        for element in iterator:
+            if isinstance(element, Error): return res.failure(element)
+            symbol_table.set(var_name, element)
+
+            value = res.register(self.visit(node.body_node, context))
+            if res.should_return() and res.loop_should_continue == False and res.loop_should_break == False: return res
+
+            if res.loop_should_continue:
+                continue
+
+            if res.loop_should_break:
+                break
+
+            if not node.should_return_null: elements.append(value)
+
+        return res.success(
+            Number.null if node.should_return_null else
+            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
+        )
+
+    def visit_WhileNode(self, node, context):
+        res = RTResult()
+        elements = []
+
+        while True:
+            condition = res.register(self.visit(node.condition_node, context))
+            if res.should_return(): return res
+
+            if not condition.is_true():
+                break
+
+            value = res.register(self.visit(node.body_node, context))
+            if res.should_return() and res.loop_should_continue == False and res.loop_should_break == False: return res
+
+            if res.loop_should_continue:
+                continue
+            
+            if res.loop_should_break:
+                break
+
+            if not node.should_return_null: elements.append(value)
+
+        return res.success(
+            Number.null if node.should_return_null else
+            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
+        )
+
+    def visit_FuncDefNode(self, node, context):
+        res = RTResult()
+
+        func_name = node.var_name_tok.value if node.var_name_tok else None
+        body_node = node.body_node
+        arg_names = [arg_name.value for arg_name in node.arg_name_toks]
+        func_value = Function(func_name, body_node, arg_names, node.should_auto_return, node.is_generator).set_context(context).set_pos(node.pos_start, node.pos_end)
+
+        if node.var_name_tok:
+            context.symbol_table.set(func_name, func_value)
+
+        return res.success(func_value)
+
+    def visit_CallNode(self, node, context):
+        res = RTResult()
+        args = []
+
+        value_to_call = res.register(self.visit(node.node_to_call, context))
+        if res.should_return(): return res
+        value_to_call = value_to_call.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
+
+        for arg_node in node.arg_nodes:
+            args.append(res.register(self.visit(arg_node, context)))
+            if res.should_return(): return res
+
+        try:
+            if self.tracing:
+                return_value = res.register(self.traced_execute(value_to_call, args, context))
+            else:
+                return_value = self.transpiler.call(value_to_call, args) if self.transpiler else None
+                if return_value is None: return_value = res.register(value_to_call.execute(args))
+        except RecursionError:
+            return res.failure(RTError(
+                node.pos_start, node.pos_end,
+                "stack overflow, python's recursion limit was reached. the 'stack' engine can go deeper",
+                context
+            ))
+        if res.should_return(): return res
+        return_value = return_value.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
+        return res.success(return_value)
+
+    def visit_ReturnNode(self, node, context):
+        res = RTResult()
+
+        if node.node_to_return:
+            value = res.register(self.visit(node.node_to_return, context))
+            if res.should_return(): return res
+        else:
+            value = Number.null
+        
+        return res.success_return(value)
+
+    def visit_YieldNode(self, node, context):
+        return RTResult().failure(RTError(
+            node.pos_start, node.pos_end,
+            "'yield' can only be used as a statement of a generator function",
+            context
+        ))
+
+    def visit_ContinueNode(self, node, context):
+        return RTResult().success_continue()
+
+    def visit_BreakNode(self, node, context):
+        return RTResult().success_break()
+
+    ###################################
+
+    def visit_InlineCallNode(self, node, context):
+        value = self.inline_call(node, context)
+        if value is None: return self.visit(node.call_node, context)
+        return RTResult().success(value)
+
+    # value of an inlined call, or None if the original call has to be made instead. calls
+    # aren't inlined while tracing, so every call is seen by the hooks
+    def inline_call(self, node, context):
+        if self.tracing: return None
+
+        symbol_table = context.symbol_table
+        if not is_inlined_function(symbol_table, node.func_name, node.body_node): return None
+
+        for name in node.checked_names:
+            if symbol_table.get(name) is None: return None
+        if not holds_scalars(symbol_table, node.scalar_names): return None
+
+        # an error is left for the original call to report, from inside the function
+        res = self.visit(node.inlined_node, context)
+        if res.error: return None
+        return res.value.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
+
+    # whether a hoisted expression changes nothing when worked out, so it can be kept.
+    # otherwise it is worked out every time as it would have been
+    def is_hoistable(self, node, symbol_table):
+        return holds_scalars(symbol_table, node.scalar_names) and all(
+            is_inlined_function(symbol_table, name, body_node) for name, body_node in node.inlined_functions.items()
+        )
+
+    def visit_HoistNode(self, node, context):
+        symbols = context.symbol_table.symbols
+
+        try:
+            return self.visit(node.loop_node, context)
+        finally:
+            for slot in node.slots: symbols.pop(slot, None)
+
+    def visit_HoistedNode(self, node, context):
+        res = RTResult()
+        symbols = context.symbol_table.symbols
+        value = symbols.get(node.slot)
+
+        if value is None:
+            keep = self.is_hoistable(node, context.symbol_table)
+            value = res.register(self.visit(node.node, context))
+            if res.should_return(): return res
+
+            # only values that can't be changed are kept for the rest of the loop
+            if not keep or not isinstance(value, (Number, String)): return res.success(value)
+            symbols[node.slot] = value
+
+        return res.success(value.copy().set_pos(node.pos_start, node.pos_end).set_context(context))
+
+# a value yielded by the body of a generator function, passed out of its evaluation
+class Yielded:
+    def __init__(self, value):
+        self.value = value
+
+class ResumableEvaluator:
+    # evaluates nodes as python generators driven from an explicit stack of frames instead of
+    # recursing through visit, so an evaluation can be suspended and resumed at any point.
+    # frames yield (node, context) to have a node evaluated and are sent back its result,
+    # anything else they yield is passed out to whoever is running the evaluation: None at
+    # loop back-edges and calls, a channel the evaluation is waiting on, an awaitable whose
+    # result should be sent back in, or a value yielded by the body of a generator function
+    # an evaluation can only be suspended at these nodes: calls, the back-edges of loops and
+    # yields. hoisted values aren't kept here, see eval_HoistNode. nodes which reach none of
+    # them are visited straight away, as making frames for them costs more than they do
+    suspending_types = (CallNode, InlineCallNode, YieldNode, ForNode, ForEachNode, WhileNode, HoistedNode)
+    # whether a node reaches a suspending node, or a yield, dropped along with the node
+    suspending_nodes = weakref.WeakKeyDictionary()
+    yielding_nodes = weakref.WeakKeyDictionary()
+
+    def __init__(self, interpreter, asynchronous=False):
+        self.interpreter = interpreter
+        # when running under run_async(), blocking builtins are yielded as awaitables
+        self.asynchronous = asynchronous
+        # number of user function calls currently on the frame stack
+        self.depth = 0
+        # nodes reaching any of these types are run on frames
+        self.frame_types = self.suspending_types
+        self.frame_nodes = self.suspending_nodes
+
+    def evaluate(self, node, context):
+        return self.run(self.eval_node(node, context))
+
+    # runs the body of a generator function, producing the values it yields. it isn't run as
+    # a task, so switches are ignored and a call waiting on an empty channel goes ahead, and
+    # runs the other tasks until a value is sent, as it would outside a task. only the nodes
+    # a yield can be reached through are run on frames, the rest are visited straight away
+    def generate(self, node, context):
+        self.frame_types, self.frame_nodes = (YieldNode,), self.yielding_nodes
+        steps = self.evaluate(node, context)
+        resume_value = None
+
+        while True:
+            try:
+                request = steps.send(resume_value)
+            except StopIteration as stop:
+                return stop.value
+
+            resume_value = None
+            if isinstance(request, Yielded):
+                yield request.value
+            elif isinstance(request, Channel):
+                resume_value = False
+
+    def run(self, frame):
+        frames = [frame]
+        result = None
+
+        while frames:
+            try:
+                request = frames[-1].send(result)
+            except StopIteration as done:
+                frames.pop()
+                result = done.value
+                continue
+
+            if type(request) is tuple:
+                node, context = request
+                method = getattr(self, f'eval_{type(node).__name__}', None)
+
+                # nodes that can't contain a call, or can't be suspended, are visited straight away
+                if method is None or not self.runs_on_frames(node):
+                    result = self.interpreter.visit(node, context)
+                    continue
+
+                if self.interpreter.budgeted:
+                    error = self.interpreter.spend_step(node, context)
+                    if error:
+                        result = RTResult().failure(error)
+                        continue
+
+                    # a paused run stops at the next node run on frames once it has used up its steps
+                    if self.interpreter.should_pause(): yield None
+
+                for hook in self.interpreter.hooks['visit']:
+                    hook(node, context)
+                frames.append(method(node, context))
+                result = None
+            else:
+                result = yield request
+
+        return result
+
+    def runs_on_frames(self, node):
+        on_frames = self.frame_nodes.get(node)
+        if on_frames is None:
+            on_frames = self.frame_nodes[node] = reaches_node(node, self.frame_types)
+        return on_frames
+
+    def eval_node(self, node, context):
+        return (yield node, context)
+
+    def call(self, value_to_call, args, context):
+        # user functions run on this evaluator's frames, so they can be suspended too, and
+        # can recurse as deep as max_depth allows without using up python's stack
+        if isinstance(value_to_call, Function) and not value_to_call.is_generator:
+            res = RTResult()
+            interpreter = self.interpreter
+
+            if self.depth >= interpreter.max_depth:
+                return res.failure(RTError(
+                    value_to_call.pos_start, value_to_call.pos_end,
+                    f'stack overflow, more than {interpreter.max_depth} calls deep',
+                    context
+                ))
+
+            tracing = interpreter.tracing
+            if tracing: interpreter.call_hooks(value_to_call, args, context)
+
+            exec_ctx = value_to_call.generate_new_context()
+            res.register(value_to_call.check_and_populate_args(value_to_call.arg_names, args, exec_ctx))
+
+            if not res.should_return():
+                self.depth += 1
+                value = res.register((yield value_to_call.body_node, exec_ctx))
+                self.depth -= 1
+                exec_ctx.release()
+                res = value_to_call.finish(res, value)
+
+            if tracing: interpreter.result_hooks(value_to_call, res, context)
+            return res
+
+        if isinstance(value_to_call, BuiltInFunction):
+            channel = value_to_call.waits_on(args)
+            while channel and not channel.values:
+                # resumed with False when no task is left to send to the channel, the call
+                # then goes ahead and fails
+                if (yield channel) is False: break
+
+            if self.asynchronous and value_to_call.blocks():
+                return (yield value_to_call.execute_async(args))
+
+        if self.interpreter.tracing:
+            return self.interpreter.traced_execute(value_to_call, args, context)
+        return value_to_call.execute(args)
+
+    ###################################
+
+    def eval_ListNode(self, node, context):
+        res = RTResult()
+        elements = []
+
+        for element_node in node.element_nodes:
+            elements.append(res.register((yield element_node, context)))
+            if res.should_return(): return res
+
+        return res.success(
+            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
+        )
+
+    def eval_MapNode(self, node, context):
+        res = RTResult()
+        entries = {}
+
+        for key_node, value_node in node.entry_nodes:
+            key = res.register((yield key_node, context))
+            if res.should_return(): return res
+
+            value = res.register((yield value_node, context))
+            if res.should_return(): return res
+
+            hash_key = key.hash_key()
+            if hash_key is None:
+                return res.failure(RTError(
+                    key_node.pos_start, key_node.pos_end,
+                    'key must be number or string',
+                    context
+                ))
+
+            entries[hash_key] = (key, value)
+
+        return res.success(
+            Map(entries).set_context(context).set_pos(node.pos_start, node.pos_end)
+        )
+
+    def eval_SetNode(self, node, context):
+        res = RTResult()
+        elements = {}
+
+        for element_node in node.element_nodes:
+            element = res.register((yield element_node, context))
+            if res.should_return(): return res
 
-#######################################
-#              context
-#######################################
+            hash_key = element.hash_key()
+            if hash_key is None:
+                return res.failure(RTError(
+                    element_node.pos_start, element_node.pos_end,
+                    'element must be number or string',
+                    context
+                ))
 
-class Context:
-    def __init__(self, display_name, parent=None, parent_entry_pos=None):
-        self.display_name = display_name
-        self.parent = parent
-        self.parent_entry_pos = parent_entry_pos
-        self.symbol_table = None
+            elements[hash_key] = element
 
-#######################################
-#           symbol table
-#######################################
+        return res.success(
+            Set(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
+        )
 
-class SymbolTable:
-    def __init__(self, parent=None):
-        self.symbols = {}
-        self.parent = parent
+    def eval_VarAssignNode(self, node, context):
+        res = RTResult()
+        value = res.register((yield node.value_node, context))
+        if res.should_return(): return res
+
+        context.symbol_table.set(node.var_name_tok.value, value)
+        return res.success(value)
+
+    def eval_BinOpNode(self, node, context):
+        res = RTResult()
+        left = res.register((yield node.left_node, context))
+        if res.should_return(): return res
+
+        short_circuit = self.interpreter.short_circuit(node, left, context)
+        if short_circuit: return res.success(short_circuit)
+
+        right = res.register((yield node.right_node, context))
+        if res.should_return(): return res
+
+        return self.interpreter.binary_operation(node, left, right)
+
+    def eval_UnaryOpNode(self, node, context):
+        res = RTResult()
+        number = res.register((yield node.node, context))
+        if res.should_return(): return res
+
+        return self.interpreter.unary_operation(node, number)
+
+    def eval_IfNode(self, node, context):
+        res = RTResult()
+
+        for condition, expr, should_return_null in node.cases:
+            condition_value = res.register((yield condition, context))
+            if res.should_return(): return res
+
+            if condition_value.is_true():
+                expr_value = res.register((yield expr, context))
+                if res.should_return(): return res
+                return res.success(Number.null if should_return_null else expr_value)
+
+        if node.else_case:
+            expr, should_return_null = node.else_case
+            expr_value = res.register((yield expr, context))
+            if res.should_return(): return res
+            return res.success(Number.null if should_return_null else expr_value)
+
+        return res.success(Number.null)
+
+    def eval_ForNode(self, node, context):
+        res = RTResult()
+        elements = []
+
+        start_value = res.register((yield node.start_value_node, context))
+        if res.should_return(): return res
+
+        end_value = res.register((yield node.end_value_node, context))
+        if res.should_return(): return res
+
+        if node.step_value_node:
+            step_value = res.register((yield node.step_value_node, context))
+            if res.should_return(): return res
+        else:
+            step_value = Number(1)
+
+        i = start_value.value
+
+        if step_value.value >= 0:
+            condition = lambda: i < end_value.value
+        else:
+            condition = lambda: i > end_value.value
+
+        while condition():
+            context.symbol_table.set(node.var_name_tok.value, Number(i))
+            i += step_value.value
+
+            value = res.register((yield node.body_node, context))
+            if res.should_return() and res.loop_should_continue == False and res.loop_should_break == False: return res
+
+            if res.loop_should_break:
+                break
+
+            yield None
+
+            if res.loop_should_continue:
+                continue
+
+            if not node.should_return_null: elements.append(value)
+
+        return res.success(
+            Number.null if node.should_return_null else
+            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
+        )
+
+    def eval_ForEachNode(self, node, context):
+        res = RTResult()
+        elements = []
+
+        iterable = res.register((yield node.iterable_node, context))
+        if res.should_return(): return res
+
+        iterator, error = iterable.iterate()
+        if error: return res.failure(error)
+
+        for element in iterator:
+            if isinstance(element, Error): return res.failure(element)
+            context.symbol_table.set(node.var_name_tok.value, element)
+
+            value = res.register((yield node.body_node, context))
+            if res.should_return() and res.loop_should_continue == False and res.loop_should_break == False: return res
+
+            if res.loop_should_break:
+                break
+
+            yield None
+
+            if res.loop_should_continue:
+                continue
+
+            if not node.should_return_null: elements.append(value)
+
+        return res.success(
+            Number.null if node.should_return_null else
+            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
+        )
+
+    def eval_WhileNode(self, node, context):
+        res = RTResult()
+        elements = []
+
+        while True:
+            condition = res.register((yield node.condition_node, context))
+            if res.should_return(): return res
+
+            if not condition.is_true():
+                break
+
+            value = res.register((yield node.body_node, context))
+            if res.should_return() and res.loop_should_continue == False and res.loop_should_break == False: return res
+
+            if res.loop_should_break:
+                break
+
+            yield None
+
+            if res.loop_should_continue:
+                continue
+
+            if not node.should_return_null: elements.append(value)
+
+        return res.success(
+            Number.null if node.should_return_null else
+            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
+        )
+
+    def eval_CallNode(self, node, context):
+        res = RTResult()
+        args = []
+
+        value_to_call = res.register((yield node.node_to_call, context))
+        if res.should_return(): return res
+        value_to_call = value_to_call.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
+
+        for arg_node in node.arg_nodes:
+            args.append(res.register((yield arg_node, context)))
+            if res.should_return(): return res
+
+        yield None
+
+        return_value = res.register((yield from self.call(value_to_call, args, context)))
+        if res.should_return(): return res
+        return_value = return_value.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
+        return res.success(return_value)
+
+    def eval_YieldNode(self, node, context):
+        res = RTResult()
+
+        if node.node_to_yield:
+            value = res.register((yield node.node_to_yield, context))
+            if res.should_return(): return res
+        else:
+            value = Number.null
+
+        yield Yielded(value)
+        return res.success(Number.null)
+
+    def eval_ReturnNode(self, node, context):
+        res = RTResult()
+
+        if node.node_to_return:
+            value = res.register((yield node.node_to_return, context))
+            if res.should_return(): return res
+        else:
+            value = Number.null
+
+        return res.success_return(value)
+
+    def eval_InlineCallNode(self, node, context):
+        value = self.interpreter.inline_call(node, context)
+        if value is not None: return RTResult().success(value)
+        return (yield node.call_node, context)
+
+    # other tasks can run between the steps of a loop here, so loops don't keep their
+    # invariant values and every hoisted expression is worked out each time
+    def eval_HoistNode(self, node, context):
+        return (yield node.loop_node, context)
+
+    def eval_HoistedNode(self, node, context):
+        return (yield node.node, context)
+
+# control flow of the closure engine, which raises these instead of returning an RTResult
+class ClosureError(Exception):
+    def __init__(self, error):
+        self.error = error
+
+class ClosureReturn(Exception):
+    def __init__(self, value):
+        self.value = value
+
+class ClosureBreak(Exception):
+    pass
+
+class ClosureContinue(Exception):
+    pass
+
+class NotANumber(Exception):
+    pass
+
+class ClosureCompiler:
+    # compiles each node once into a python closure taking a context and returning a value,
+    # with the closures of its children called directly inside it, so running a program
+    # skips the dispatch and result objects of visiting. the instrumented compiler fires
+    # visit hooks and counts steps for budgets, and is used while either is active
+    unboxed_operations = dict(Number.operations, **{
+        'bitwise_anded_by': lambda a, b: a & b,
+        'bitwise_ored_by': lambda a, b: a | b,
+        'bitwise_xored_by': lambda a, b: a ^ b,
+        'lshifted_by': lambda a, b: a << b,
+        'rshifted_by': lambda a, b: a >> b
+    })
+
+    # raised while evaluating unboxed where the value methods would have to be used
+    unboxed_errors = (NotANumber, ArithmeticError, TypeError, ValueError)
+
+    def __init__(self, interpreter, instrumented=False):
+        self.interpreter = interpreter
+        self.instrumented = instrumented
+        # closures are dropped along with the nodes they were compiled from
+        self.closures = weakref.WeakKeyDictionary()
+        self.unboxed_closures = weakref.WeakKeyDictionary()
+
+    def run(self, node, context):
+        res = RTResult()
+
+        try:
+            return res.success(self.compile(node)(context))
+        except ClosureError as signal:
+            return res.failure(signal.error)
+        except ClosureReturn as signal:
+            return res.success_return(signal.value)
+        except ClosureBreak:
+            return res.success_break()
+        except ClosureContinue:
+            return res.success_continue()
+
+    def compile(self, node):
+        closure = self.closures.get(node)
+
+        if closure is None:
+            method = getattr(self, f'compile_{type(node).__name__}', self.no_compile_method)
+            closure = method(node)
+            if self.instrumented: closure = self.instrument(node, closure)
+            self.closures[node] = closure
+
+        return closure
+
+    def no_compile_method(self, node):
+        raise Exception(f'no compile_{type(node).__name__} method defined')
+
+    def instrument(self, node, closure):
+        interpreter = self.interpreter
+
+        def run(context):
+            for hook in interpreter.hooks['visit']:
+                hook(node, context)
+
+            if interpreter.budgeted:
+                error = interpreter.spend_step(node, context)
+                if error: raise ClosureError(error)
+
+            return closure(context)
+        return run
+
+    ###################################
+
+    # expressions made only of numbers, variables and operators on them are evaluated on
+    # plain python numbers, and only their result is boxed into a Number. variables can be
+    # read from a caller's scope, so they are checked to hold numbers as they are read. if
+    # one doesn't, or an operation fails, the expression is evaluated boxed instead, which
+    # is safe because these expressions have no side effects. the boxed closure is used
+    # from then on, and always by the instrumented compiler, which has to visit every node
+    def unbox(self, node, closure):
+        unboxed = None if self.instrumented else self.compile_unboxed(node)
+        if unboxed is None: return closure
+
+        unboxed_errors, pos_start, pos_end = self.unboxed_errors, node.pos_start, node.pos_end
+
+        def run(context):
+            nonlocal unboxed
+
+            if unboxed:
+                try:
+                    value = unboxed(context)
+                except unboxed_errors:
+                    unboxed = None
+                else:
+                    result = Number(value)
+                    result.context = context
+                    result.pos_start, result.pos_end = pos_start, pos_end
+                    return result
+
+            return closure(context)
+        return run
+
+    # closure returning whether a condition is true, without boxing unboxed expressions
+    def compile_condition(self, node):
+        closure = self.compile(node)
+        unboxed = None if self.instrumented else self.compile_unboxed(node)
+
+        if unboxed is None:
+            def run(context):
+                return closure(context).is_true()
+            return run
+
+        unboxed_errors = self.unboxed_errors
+
+        def run(context):
+            nonlocal unboxed
+
+            if unboxed:
+                try:
+                    return unboxed(context) != 0
+                except unboxed_errors:
+                    unboxed = None
+
+            return closure(context).is_true()
+        return run
+
+    def compile_unboxed(self, node):
+        if node not in self.unboxed_closures:
+            method = getattr(self, f'unboxed_{type(node).__name__}', None)
+            self.unboxed_closures[node] = method(node) if method else None
+
+        return self.unboxed_closures[node]
+
+    # a lone number or variable isn't worth unboxing, only operators on them are
+    def compile_unboxed_operand(self, node):
+        if isinstance(node, NumberNode):
+            value = node.tok.value
+
+            def run(context):
+                return value
+            return run
+
+        if isinstance(node, VarAccessNode):
+            var_name = node.var_name_tok.value
+
+            def run(context):
+                value = context.symbol_table.get(var_name)
+                if type(value) is not Number: raise NotANumber()
+                return value.value
+            return run
+
+        if isinstance(node, HoistedNode):
+            closure, slot = self.compile(node), node.slot
+            is_hoistable = self.interpreter.is_hoistable
+
+            def run(context):
+                value = context.symbol_table.symbols.get(slot)
+
+                # the expression falls back to being worked out boxed, so the hoisted value is
+                # only worked out here when doing it twice changes nothing
+                if value is None:
+                    if not is_hoistable(node, context.symbol_table): raise NotANumber()
+                    value = closure(context)
+
+                if type(value) is not Number: raise NotANumber()
+                return value.value
+            return run
+
+        return self.compile_unboxed(node)
+
+    def unboxed_BinOpNode(self, node):
+        left, right = self.compile_unboxed_operand(node.left_node), self.compile_unboxed_operand(node.right_node)
+        if left is None or right is None: return None
+
+        if node.method_name == 'anded_by':
+            def run(context):
+                return int(left(context) and right(context))
+            return run
+
+        if node.method_name == 'ored_by':
+            def run(context):
+                return int(left(context) or right(context))
+            return run
+
+        operation = self.unboxed_operations[node.method_name]
+
+        def run(context):
+            return operation(left(context), right(context))
+        return run
+
+    def unboxed_UnaryOpNode(self, node):
+        number = self.compile_unboxed_operand(node.node)
+        if number is None: return None
+
+        if node.op_tok.type == tt_minus:
+            def run(context):
+                return number(context) * -1
+            return run
+
+        if node.op_tok.matches(tt_keyword, 'not'):
+            def run(context):
+                return 1 if number(context) == 0 else 0
+            return run
+
+        return None
+
+    ###################################
+
+    def compile_NumberNode(self, node):
+        value, pos_start, pos_end = node.tok.value, node.pos_start, node.pos_end
+
+        def run(context):
+            return Number(value).set_context(context).set_pos(pos_start, pos_end)
+        return run
+
+    def compile_StringNode(self, node):
+        value, pos_start, pos_end = node.tok.value, node.pos_start, node.pos_end
+
+        def run(context):
+            return String(value).set_context(context).set_pos(pos_start, pos_end)
+        return run
+
+    def compile_ListNode(self, node):
+        elements = [self.compile(element_node) for element_node in node.element_nodes]
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context):
+            return List([element(context) for element in elements]).set_context(context).set_pos(pos_start, pos_end)
+        return run
+
+    def compile_MapNode(self, node):
+        entry_nodes = [(key_node, self.compile(key_node), self.compile(value_node)) for key_node, value_node in node.entry_nodes]
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context):
+            entries = {}
+
+            for key_node, key, value in entry_nodes:
+                key = key(context)
+                value = value(context)
+
+                hash_key = key.hash_key()
+                if hash_key is None:
+                    raise ClosureError(RTError(
+                        key_node.pos_start, key_node.pos_end,
+                        'key must be number or string',
+                        context
+                    ))
+
+                entries[hash_key] = (key, value)
+
+            return Map(entries).set_context(context).set_pos(pos_start, pos_end)
+        return run
+
+    def compile_SetNode(self, node):
+        element_nodes = [(element_node, self.compile(element_node)) for element_node in node.element_nodes]
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context):
+            elements = {}
+
+            for element_node, element in element_nodes:
+                element = element(context)
+
+                hash_key = element.hash_key()
+                if hash_key is None:
+                    raise ClosureError(RTError(
+                        element_node.pos_start, element_node.pos_end,
+                        'element must be number or string',
+                        context
+                    ))
+
+                elements[hash_key] = element
+
+            return Set(elements).set_context(context).set_pos(pos_start, pos_end)
+        return run
+
+    def compile_VarAccessNode(self, node):
+        var_name, pos_start, pos_end = node.var_name_tok.value, node.pos_start, node.pos_end
+
+        def run(context):
+            value = context.symbol_table.get(var_name)
+
+            if not value:
+                raise ClosureError(RTError(
+                    pos_start, pos_end,
+                    f"'{var_name}' is not defined",
+                    context
+                ))
+
+            return value.copy().set_pos(pos_start, pos_end).set_context(context)
+        return run
+
+    def compile_VarAssignNode(self, node):
+        var_name, value_closure = node.var_name_tok.value, self.compile(node.value_node)
+
+        def run(context):
+            value = value_closure(context)
+            context.symbol_table.set(var_name, value)
+            return value
+        return run
+
+    def compile_BinOpNode(self, node):
+        left_closure, right_closure = self.compile(node.left_node), self.compile(node.right_node)
+        method_name, pos_start, pos_end = node.method_name, node.pos_start, node.pos_end
+
+        if node.op_tok.type == tt_keyword:
+            short_circuit = self.interpreter.short_circuit
+
+            def run(context):
+                left = left_closure(context)
+
+                short_circuited = short_circuit(node, left, context)
+                if short_circuited: return short_circuited
+
+                result, error = getattr(left, method_name)(right_closure(context))
+                if error: raise ClosureError(error)
+                return result.set_pos(pos_start, pos_end)
+            return self.unbox(node, run)
+
+        number_operation = Number.operations.get(method_name)
+
+        def run(context):
+            left = left_closure(context)
+            right = right_closure(context)
+
+            # two numbers skip the value methods, unless dividing by zero
+            if number_operation and type(left) is Number and type(right) is Number:
+                try:
+                    result = Number(number_operation(left.value, right.value))
+                except ZeroDivisionError:
+                    pass
+                else:
+                    result.context = left.context
+                    result.pos_start, result.pos_end = pos_start, pos_end
+                    return result
+
+            result, error = getattr(left, method_name)(right)
+            if error: raise ClosureError(error)
+            return result.set_pos(pos_start, pos_end)
+        return self.unbox(node, run)
+
+    def compile_UnaryOpNode(self, node):
+        number_closure = self.compile(node.node)
+        op_tok, pos_start, pos_end = node.op_tok, node.pos_start, node.pos_end
+
+        def run(context):
+            number = number_closure(context)
+            error = None
+
+            if op_tok.type == tt_minus:
+                number, error = number.multed_by(Number(-1))
+            elif op_tok.matches(tt_keyword, 'not'):
+                number, error = number.notted()
+
+            if error: raise ClosureError(error)
+            return number.set_pos(pos_start, pos_end)
+        return self.unbox(node, run)
+
+    def compile_IfNode(self, node):
+        cases = [(self.compile_condition(condition), self.compile(expr), should_return_null) for condition, expr, should_return_null in node.cases]
+        else_case = (self.compile(node.else_case[0]), node.else_case[1]) if node.else_case else None
+
+        def run(context):
+            for condition, expr, should_return_null in cases:
+                if condition(context):
+                    value = expr(context)
+                    return Number.null if should_return_null else value
+
+            if else_case:
+                expr, should_return_null = else_case
+                value = expr(context)
+                return Number.null if should_return_null else value
+
+            return Number.null
+        return run
+
+    def compile_ForNode(self, node):
+        start_closure = self.compile(node.start_value_node)
+        end_closure = self.compile(node.end_value_node)
+        step_closure = self.compile(node.step_value_node) if node.step_value_node else None
+        body = self.compile(node.body_node)
+        var_name, should_return_null = node.var_name_tok.value, node.should_return_null
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context):
+            elements = []
+
+            start_value = start_closure(context)
+            end_value = end_closure(context)
+            step_value = step_closure(context) if step_closure else Number(1)
+
+            i = start_value.value
+            ascending = step_value.value >= 0
+
+            while i < end_value.value if ascending else i > end_value.value:
+                context.symbol_table.set(var_name, Number(i))
+                i += step_value.value
+
+                try:
+                    value = body(context)
+                except ClosureContinue:
+                    continue
+                except ClosureBreak:
+                    break
+
+                if not should_return_null: elements.append(value)
+
+            return (
+                Number.null if should_return_null else
+                List(elements).set_context(context).set_pos(pos_start, pos_end)
+            )
+        return run
+
+    def compile_ForEachNode(self, node):
+        iterable_closure, body = self.compile(node.iterable_node), self.compile(node.body_node)
+        var_name, should_return_null = node.var_name_tok.value, node.should_return_null
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context):
+            elements = []
+
+            iterator, error = iterable_closure(context).iterate()
+            if error: raise ClosureError(error)
+
+            symbol_table = context.symbol_table
+
+            for element in iterator:
+                if isinstance(element, Error): raise ClosureError(element)
+                symbol_table.set(var_name, element)
+
+                try:
+                    value = body(context)
+                except ClosureContinue:
+                    continue
+                except ClosureBreak:
+                    break
+
+                if not should_return_null: elements.append(value)
+
+            return (
+                Number.null if should_return_null else
+                List(elements).set_context(context).set_pos(pos_start, pos_end)
+            )
+        return run
+
+    def compile_WhileNode(self, node):
+        condition, body = self.compile_condition(node.condition_node), self.compile(node.body_node)
+        should_return_null, pos_start, pos_end = node.should_return_null, node.pos_start, node.pos_end
+
+        def run(context):
+            elements = []
+
+            while condition(context):
+                try:
+                    value = body(context)
+                except ClosureContinue:
+                    continue
+                except ClosureBreak:
+                    break
+
+                if not should_return_null: elements.append(value)
+
+            return (
+                Number.null if should_return_null else
+                List(elements).set_context(context).set_pos(pos_start, pos_end)
+            )
+        return run
+
+    def compile_FuncDefNode(self, node):
+        func_name = node.var_name_tok.value if node.var_name_tok else None
+        arg_names = [arg_name.value for arg_name in node.arg_name_toks]
 
-    def get(self, name):
-        value = self.symbols.get(name, None)
-        if value == None and self.parent:
-            return self.parent.get(name)
-        return value
+        def run(context):
+            func_value = Function(func_name, node.body_node, arg_names, node.should_auto_return, node.is_generator).set_context(context).set_pos(node.pos_start, node.pos_end)
 
-    def set(self, name, value):
-        self.symbols[name] = value
+            if func_name:
+                context.symbol_table.set(func_name, func_value)
 
-    def remove(self, name):
-        del self.symbols[name]
+            return func_value
+        return run
 
-#######################################
-#           interpreter
-#######################################
+    def compile_CallNode(self, node):
+        callee = self.compile(node.node_to_call)
+        arg_closures = [self.compile(arg_node) for arg_node in node.arg_nodes]
+        pos_start, pos_end = node.pos_start, node.pos_end
+        interpreter = self.interpreter
 
-class Interpreter:
-    def visit(self, node, context):
-        method_name = f'visit_{type(node).__name__}'
-        method = getattr(self, method_name, self.no_visit_method)
-        return method(node, context)
+        def run(context):
+            value_to_call = callee(context).copy().set_pos(pos_start, pos_end).set_context(context)
+            args = [arg(context) for arg in arg_closures]
 
-    def no_visit_method(self, node, context):
-        raise Exception(f'no visit_{type(node).__name__} method defined')
+            try:
+                if interpreter.tracing:
+                    interpreter.call_hooks(value_to_call, args, context)
+                    try:
+                        return_value = self.call(value_to_call, args)
+                    except ClosureError as signal:
+                        interpreter.result_hooks(value_to_call, RTResult().failure(signal.error), context)
+                        raise
+                    interpreter.result_hooks(value_to_call, RTResult().success(return_value), context)
+                else:
+                    return_value = self.call(value_to_call, args)
+            except RecursionError:
+                raise ClosureError(RTError(
+                    pos_start, pos_end,
+                    "stack overflow, python's recursion limit was reached. the 'stack' engine can go deeper",
+                    context
+                ))
 
-    ###################################
+            return return_value.copy().set_pos(pos_start, pos_end).set_context(context)
+        return run
 
-    def visit_NumberNode(self, node, context):
-        return RTResult().success(
-            Number(node.tok.value).set_context(context).set_pos(node.pos_start, node.pos_end)
-        )
+    def call(self, value_to_call, args):
+        # user functions run their compiled body, anything else is executed as normal
+        if not isinstance(value_to_call, Function) or value_to_call.is_generator:
+            res = value_to_call.execute(args)
+            if res.error: raise ClosureError(res.error)
+            return res.value
 
-    def visit_StringNode(self, node, context):
-        return RTResult().success(
-            String(node.tok.value).set_context(context).set_pos(node.pos_start, node.pos_end)
-        )
+        transpiler = self.interpreter.transpiler
+        if transpiler:
+            value = transpiler.call(value_to_call, args)
+            if value is not None: return value
 
-    def visit_ListNode(self, node, context):
-        res = RTResult()
-        elements = []
+        exec_ctx = value_to_call.generate_new_context()
+        res = value_to_call.check_and_populate_args(value_to_call.arg_names, args, exec_ctx)
+        if res.error: raise ClosureError(res.error)
 
-        for element_node in node.element_nodes:
-            elements.append(res.register(self.visit(element_node, context)))
-            if res.should_return(): return res
+        try:
+            value = self.compile(value_to_call.body_node)(exec_ctx)
+        except ClosureReturn as signal:
+            return signal.value
+        finally:
+            exec_ctx.release()
 
-        return res.success(
-            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
-        )
+        return value if value_to_call.should_auto_return else Number.null
 
-    def visit_VarAccessNode(self, node, context):
-        res = RTResult()
-        var_name = node.var_name_tok.value
-        value = context.symbol_table.get(var_name)
+    def compile_ReturnNode(self, node):
+        value_closure = self.compile(node.node_to_return) if node.node_to_return else None
 
-        if not value:
-            return res.failure(RTError(
+        def run(context):
+            raise ClosureReturn(value_closure(context) if value_closure else Number.null)
+        return run
+
+    def compile_YieldNode(self, node):
+        def run(context):
+            raise ClosureError(RTError(
                 node.pos_start, node.pos_end,
-                f"'{var_name}' is not defined",
+                "'yield' can only be used as a statement of a generator function",
                 context
             ))
+        return run
+
+    def compile_ContinueNode(self, node):
+        def run(context):
+            raise ClosureContinue()
+        return run
+
+    def compile_BreakNode(self, node):
+        def run(context):
+            raise ClosureBreak()
+        return run
+
+    def compile_InlineCallNode(self, node):
+        inlined, call = self.compile(node.inlined_node), self.compile(node.call_node)
+        func_name, body_node, checked_names = node.func_name, node.body_node, node.checked_names
+        scalar_names = node.scalar_names
+        pos_start, pos_end = node.pos_start, node.pos_end
+        interpreter = self.interpreter
+
+        def run(context):
+            symbol_table = context.symbol_table
+
+            if (
+                not interpreter.tracing and is_inlined_function(symbol_table, func_name, body_node) and
+                all(symbol_table.get(name) is not None for name in checked_names) and
+                holds_scalars(symbol_table, scalar_names)
+            ):
+                try:
+                    return inlined(context).copy().set_pos(pos_start, pos_end).set_context(context)
+                except ClosureError:
+                    pass
+
+            return call(context)
+        return run
+
+    def compile_HoistNode(self, node):
+        loop, slots = self.compile(node.loop_node), node.slots
+
+        def run(context):
+            symbols = context.symbol_table.symbols
 
-        value = value.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
-        return res.success(value)
+            try:
+                return loop(context)
+            finally:
+                for slot in slots: symbols.pop(slot, None)
+        return run
+
+    def compile_HoistedNode(self, node):
+        closure, slot, pos_start, pos_end = self.compile(node.node), node.slot, node.pos_start, node.pos_end
+        is_hoistable = self.interpreter.is_hoistable
+
+        def run(context):
+            symbols = context.symbol_table.symbols
+            value = symbols.get(slot)
+
+            if value is None:
+                keep = is_hoistable(node, context.symbol_table)
+                value = closure(context)
+                if not keep or not isinstance(value, (Number, String)): return value
+                symbols[slot] = value
+
+            return value.copy().set_pos(pos_start, pos_end).set_context(context)
+        return run
+
+class TranslationError(Exception):
+    pass
+
+class Transpiler:
+    # translates the bodies of hot functions into python functions, compiled by python's own
+    # compiler and called in place of the interpreter. only functions of numbers are
+    # translated: arguments, local variables, arithmetic, comparisons, if, for, while and
+    # calls to the function itself, a function using anything else stays interpreted.
+    # those functions can't have side effects, so a translated call that fails in any way,
+    # a division by zero or a variable only defined by a caller, is run again by the
+    # interpreter, which reports the error as usual
+    arithmetic_operators = {
+        tt_plus: '+',
+        tt_minus: '-',
+        tt_mul: '*',
+        tt_div: '/',
+        tt_intdiv: '//',
+        tt_mod: '%',
+        tt_band: '&',
+        tt_bor: '|',
+        tt_bxor: '^',
+        tt_lshift: '<<',
+        tt_rshift: '>>',
+        tt_pow: '**'
+    }
+
+    comparison_operators = {
+        tt_ee: '==',
+        tt_ne: '!=',
+        tt_lt: '<',
+        tt_gt: '>',
+        tt_lte: '<=',
+        tt_gte: '>='
+    }
+
+    # errors a translated call can raise where the interpreter would report a runtime error
+    fallback_errors = (ArithmeticError, NameError, TypeError, ValueError, RecursionError)
+
+    def __init__(self, interpreter, threshold=1000):
+        self.interpreter = interpreter
+        self.threshold = threshold
+        # calls made to each function body, and the python function each hot body was
+        # translated to, or None if it couldn't be
+        self.counts = weakref.WeakKeyDictionary()
+        self.functions = weakref.WeakKeyDictionary()
+
+    def call(self, function, args):
+        # result of the call, or None if the function has to be interpreted
+        interpreter = self.interpreter
+        if not isinstance(function, Function) or interpreter.budgeted or interpreter.tracing or interpreter.hooks['visit']:
+            return None
 
-    def visit_VarAssignNode(self, node, context):
-        res = RTResult()
-        var_name = node.var_name_tok.value
-        value = res.register(self.visit(node.value_node, context))
-        if res.should_return(): return res
+        body_node = function.body_node
 
-        context.symbol_table.set(var_name, value)
-        return res.success(value)
+        if body_node not in self.functions:
+            count = self.counts.get(body_node, 0) + 1
+            self.counts[body_node] = count
+            if count < self.threshold: return None
+            self.functions[body_node] = self.translate(function)
 
-    def visit_BinOpNode(self, node, context):
-        res = RTResult()
-        left = res.register(self.visit(node.left_node, context))
-        if res.should_return(): return res
-        right = res.register(self.visit(node.right_node, context))
-        if res.should_return(): return res
+        translated = self.functions[body_node]
+        if translated is None or len(args) != len(function.arg_names): return None
+        python_function, recursive = translated
 
-        if node.op_tok.type == tt_plus:
-            result, error = left.added_to(right)
-        elif node.op_tok.type == tt_minus:
-            result, error = left.subbed_by(right)
-        elif node.op_tok.type == tt_mul:
-            result, error = left.multed_by(right)
-        elif node.op_tok.type == tt_div:
-            result, error = left.dived_by(right)
-        elif node.op_tok.type == tt_pow:
-            result, error = left.powed_by(right)
-        elif node.op_tok.type == tt_ee:
-            result, error = left.get_comparison_eq(right)
-        elif node.op_tok.type == tt_ne:
-            result, error = left.get_comparison_ne(right)
-        elif node.op_tok.type == tt_lt:
-            result, error = left.get_comparison_lt(right)
-        elif node.op_tok.type == tt_gt:
-            result, error = left.get_comparison_gt(right)
-        elif node.op_tok.type == tt_lte:
-            result, error = left.get_comparison_lte(right)
-        elif node.op_tok.type == tt_gte:
-            result, error = left.get_comparison_gte(right)
-        elif node.op_tok.matches(tt_keyword, 'and'):
-            result, error = left.anded_by(right)
-        elif node.op_tok.matches(tt_keyword, 'or'):
-            result, error = left.ored_by(right)
+        for arg in args:
+            if not isinstance(arg, Number): return None
 
-        if error:
-            return res.failure(error)
-        else:
-            return res.success(result.set_pos(node.pos_start, node.pos_end))
+        # a function calling itself by name has to be what that name refers to
+        if recursive:
+            value = function.context.symbol_table.get(function.name) if function.context else None
+            if not isinstance(value, Function) or value.body_node is not body_node: return None
 
-    def visit_UnaryOpNode(self, node, context):
-        res = RTResult()
-        number = res.register(self.visit(node.node, context))
-        if res.should_return(): return res
+        try:
+            return Number(python_function(*[arg.value for arg in args]))
+        except self.fallback_errors:
+            # translated again once the function has been called enough times since
+            del self.functions[body_node]
+            self.counts[body_node] = 0
+            return None
 
-        error = None
+    def translate(self, function):
+        if function.is_generator: return None
 
-        if node.op_tok.type == tt_minus:
-            number, error = number.multed_by(Number(-1))
-        elif node.op_tok.matches(tt_keyword, 'not'):
-            number, error = number.notted()
+        self.name = function.name
+        self.reads = set()
+        self.assigned = set()
+        self.recursive = False
+        self.loops = 0
+        self.temporaries = 0
 
-        if error:
-            return res.failure(error)
-        else:
-            return res.success(number.set_pos(node.pos_start, node.pos_end))
+        try:
+            if function.should_auto_return:
+                lines = [f'return {self.expression(function.body_node)}']
+            else:
+                lines = self.statements(function.body_node) + ['return 0']
 
-    def visit_IfNode(self, node, context):
-        res = RTResult()
+            variables = self.assigned | set(function.arg_names)
+            if not self.reads <= variables: return None
+            if self.recursive and self.name in variables: return None
 
-        for condition, expr, should_return_null in node.cases:
-            condition_value = res.register(self.visit(condition, context))
-            if res.should_return(): return res
+            source = '\n'.join(
+                [f"def jitted({', '.join(f'v_{arg_name}' for arg_name in function.arg_names)}):"] +
+                ['    ' + line for line in lines]
+            )
 
-            if condition_value.is_true():
-                expr_value = res.register(self.visit(expr, context))
-                if res.should_return(): return res
-                return res.success(Number.null if should_return_null else expr_value)
+            namespace = {}
+            exec(compile(source, f'<jit {function.name}>', 'exec'), namespace)
+        except (TranslationError, SyntaxError, RecursionError):
+            return None
 
-        if node.else_case:
-            expr, should_return_null = node.else_case
-            expr_value = res.register(self.visit(expr, context))
-            if res.should_return(): return res
-            return res.success(Number.null if should_return_null else expr_value)
+        return namespace['jitted'], self.recursive
 
-        return res.success(Number.null)
+    def temporary(self):
+        self.temporaries += 1
+        return self.temporaries
 
-    def visit_ForNode(self, node, context):
-        res = RTResult()
-        elements = []
+    def indent(self, lines):
+        return ['    ' + line for line in lines]
 
-        start_value = res.register(self.visit(node.start_value_node, context))
-        if res.should_return(): return res
+    ###################################
 
-        end_value = res.register(self.visit(node.end_value_node, context))
-        if res.should_return(): return res
+    def expression(self, node):
+        method = getattr(self, f'expression_{type(node).__name__}', None)
+        if method is None: raise TranslationError()
+        return method(node)
 
-        if node.step_value_node:
-            step_value = res.register(self.visit(node.step_value_node, context))
-            if res.should_return(): return res
-        else:
-            step_value = Number(1)
+    def expression_NumberNode(self, node):
+        return repr(node.tok.value)
 
-        i = start_value.value
+    def expression_VarAccessNode(self, node):
+        self.reads.add(node.var_name_tok.value)
+        return f'v_{node.var_name_tok.value}'
 
-        if step_value.value >= 0:
-            condition = lambda: i < end_value.value
+    def expression_VarAssignNode(self, node):
+        # assignments used as values need python 3.8's assignment expressions, before that
+        # functions using them are interpreted. assignment statements translate on any version
+        if sys.version_info < (3, 8): raise TranslationError()
+
+        self.assigned.add(node.var_name_tok.value)
+        return f'(v_{node.var_name_tok.value} := {self.expression(node.value_node)})'
+
+    def expression_BinOpNode(self, node):
+        op_tok = node.op_tok
+        left, right = self.expression(node.left_node), self.expression(node.right_node)
+
+        if op_tok.type in self.arithmetic_operators:
+            return f'({left} {self.arithmetic_operators[op_tok.type]} {right})'
+        if op_tok.type in self.comparison_operators:
+            return f'int({left} {self.comparison_operators[op_tok.type]} {right})'
+        if op_tok.matches(tt_keyword, 'and') or op_tok.matches(tt_keyword, 'or'):
+            return f'int({left} {op_tok.value} {right})'
+
+        raise TranslationError()
+
+    def expression_UnaryOpNode(self, node):
+        number = self.expression(node.node)
+
+        if node.op_tok.type == tt_minus:
+            return f'({number} * -1)'
+        if node.op_tok.matches(tt_keyword, 'not'):
+            return f'(1 if {number} == 0 else 0)'
+
+        raise TranslationError()
+
+    def expression_IfNode(self, node):
+        if node.else_case:
+            else_expr, should_return_null = node.else_case
+            if should_return_null: raise TranslationError()
+            result = self.expression(else_expr)
         else:
-            condition = lambda: i > end_value.value
-        
-        while condition():
-            context.symbol_table.set(node.var_name_tok.value, Number(i))
-            i += step_value.value
+            result = '0'
 
-            value = res.register(self.visit(node.body_node, context))
-            if res.should_return() and res.loop_should_continue == False and res.loop_should_break == False: return res
-            
-            if res.loop_should_continue:
-                continue
-            
-            if res.loop_should_break:
-                break
+        for condition, expr, should_return_null in reversed(node.cases):
+            if should_return_null: raise TranslationError()
+            result = f'({self.expression(expr)} if {self.condition(condition)} else {result})'
 
-            elements.append(value)
+        return result
 
-        return res.success(
-            Number.null if node.should_return_null else
-            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
-        )
+    def expression_HoistedNode(self, node):
+        return self.expression(node.node)
 
-    def visit_WhileNode(self, node, context):
-        res = RTResult()
-        elements = []
+    def expression_CallNode(self, node):
+        node_to_call = node.node_to_call
 
-        while True:
-            condition = res.register(self.visit(node.condition_node, context))
-            if res.should_return(): return res
+        if not isinstance(node_to_call, VarAccessNode) or node_to_call.var_name_tok.value != self.name:
+            raise TranslationError()
 
-            if not condition.is_true():
-                break
+        self.recursive = True
+        return f"jitted({', '.join(self.expression(arg_node) for arg_node in node.arg_nodes)})"
 
-            value = res.register(self.visit(node.body_node, context))
-            if res.should_return() and res.loop_should_continue == False and res.loop_should_break == False: return res
+    # truth tests can use python's own truthiness, which is the same as is_true for numbers
+    def condition(self, node):
+        if isinstance(node, BinOpNode):
+            op_tok = node.op_tok
 
-            if res.loop_should_continue:
-                continue
-            
-            if res.loop_should_break:
-                break
+            if op_tok.type in self.comparison_operators:
+                return f'({self.expression(node.left_node)} {self.comparison_operators[op_tok.type]} {self.expression(node.right_node)})'
+            if op_tok.matches(tt_keyword, 'and') or op_tok.matches(tt_keyword, 'or'):
+                return f'({self.condition(node.left_node)} {op_tok.value} {self.condition(node.right_node)})'
 
-            elements.append(value)
+        if isinstance(node, UnaryOpNode) and node.op_tok.matches(tt_keyword, 'not'):
+            return f'(not {self.condition(node.node)})'
 
-        return res.success(
-            Number.null if node.should_return_null else
-            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
-        )
+        return self.expression(node)
 
-    def visit_FuncDefNode(self, node, context):
-        res = RTResult()
+    ###################################
 
-        func_name = node.var_name_tok.value if node.var_name_tok else None
-        body_node = node.body_node
-        arg_names = [arg_name.value for arg_name in node.arg_name_toks]
-        func_value = Function(func_name, body_node, arg_names, node.should_auto_return).set_context(context).set_pos(node.pos_start, node.pos_end)
+    # statements are nodes whose value isn't used, any other node is translated as an expression
+    def statements(self, node):
+        method = getattr(self, f'statements_{type(node).__name__}', None)
+        if method is None: return [self.expression(node)]
+        return method(node)
 
-        if node.var_name_tok:
-            context.symbol_table.set(func_name, func_value)
+    def statements_ListNode(self, node):
+        lines = []
 
-        return res.success(func_value)
+        for element_node in node.element_nodes:
+            lines.extend(self.statements(element_node))
 
-    def visit_CallNode(self, node, context):
-        res = RTResult()
-        args = []
+        return lines or ['pass']
 
-        value_to_call = res.register(self.visit(node.node_to_call, context))
-        if res.should_return(): return res
-        value_to_call = value_to_call.copy().set_pos(node.pos_start, node.pos_end)
+    def statements_VarAssignNode(self, node):
+        self.assigned.add(node.var_name_tok.value)
+        return [f'v_{node.var_name_tok.value} = {self.expression(node.value_node)}']
 
-        for arg_node in node.arg_nodes:
-            args.append(res.register(self.visit(arg_node, context)))
-            if res.should_return(): return res
+    def statements_IfNode(self, node):
+        lines = []
 
-        return_value = res.register(value_to_call.execute(args))
-        if res.should_return(): return res
-        return_value = return_value.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
-        return res.success(return_value)
+        for i, (condition, expr, _) in enumerate(node.cases):
+            lines.append(f"{'if' if i == 0 else 'elif'} {self.condition(condition)}:")
+            lines.extend(self.indent(self.statements(expr)))
 
-    def visit_ReturnNode(self, node, context):
-        res = RTResult()
+        if node.else_case:
+            lines.append('else:')
+            lines.extend(self.indent(self.statements(node.else_case[0])))
 
-        if node.node_to_return:
-            value = res.register(self.visit(node.node_to_return, context))
-            if res.should_return(): return res
-        else:
-            value = Number.null
-        
-        return res.success_return(value)
+        return lines
 
-    def visit_ContinueNode(self, node, context):
-        return RTResult().success_continue()
+    def statements_ForNode(self, node):
+        n = self.temporary()
+        var_name = node.var_name_tok.value
+        self.assigned.add(var_name)
+
+        lines = [
+            f't_i{n} = {self.expression(node.start_value_node)}',
+            f't_end{n} = {self.expression(node.end_value_node)}',
+            f't_step{n} = {self.expression(node.step_value_node) if node.step_value_node else 1}',
+            f't_ascending{n} = t_step{n} >= 0',
+            f'while t_i{n} < t_end{n} if t_ascending{n} else t_i{n} > t_end{n}:',
+            f'    v_{var_name} = t_i{n}',
+            f'    t_i{n} += t_step{n}'
+        ]
+
+        self.loops += 1
+        lines.extend(self.indent(self.statements(node.body_node)))
+        self.loops -= 1
+        return lines
+
+    def statements_WhileNode(self, node):
+        lines = [f'while {self.condition(node.condition_node)}:']
+
+        self.loops += 1
+        lines.extend(self.indent(self.statements(node.body_node)))
+        self.loops -= 1
+        return lines
+
+    def statements_ReturnNode(self, node):
+        return [f'return {self.expression(node.node_to_return) if node.node_to_return else 0}']
+
+    def statements_ContinueNode(self, node):
+        if not self.loops: raise TranslationError()
+        return ['continue']
+
+    def statements_BreakNode(self, node):
+        if not self.loops: raise TranslationError()
+        return ['break']
+
+    # python keeps its own values unboxed, so hoisting gains nothing here
+    def statements_HoistNode(self, node):
+        return self.statements(node.loop_node)
 
-    def visit_BreakNode(self, node, context):
-        return RTResult().success_break()
+#######################################
+#               tasks
+#######################################
+
+class Scheduler:
+    # runs the tasks of an interpreter cooperatively. each task runs on its own resumable
+    # evaluator and is switched out after passing a number of loop back-edges and calls,
+    # or when it waits on an empty channel or, under run_async(), on a blocking builtin
+    def __init__(self, interpreter, switch_interval=100, slices_per_await=100):
+        self.interpreter = interpreter
+        self.switch_interval = switch_interval
+        # how many times tasks are switched before control is given back to the event loop
+        self.slices_per_await = slices_per_await
+        self.ready = deque()
+        # futures of the blocking builtins tasks are waiting on, with the waiting task
+        self.pending = {}
+        self.asynchronous = False
+
+    def spawn(self, function, args, context):
+        evaluator = ResumableEvaluator(self.interpreter, self.asynchronous)
+        task = Task(function.name, evaluator.run(evaluator.call(function, args, context)))
+        self.ready.append(task)
+        return task
+
+    # runs the task until it is switched out, returns the error it failed with
+    def step(self, task):
+        try:
+            for _ in range(self.switch_interval):
+                request = task.steps.send(task.resume_value)
+                task.resume_value = None
+
+                if request is None:
+                    if self.interpreter.should_pause(): break
+                    continue
+
+                if isinstance(request, Channel):
+                    task.channel = request
+                    request.waiting.append(task)
+                else:
+                    self.pending[asyncio.ensure_future(request)] = task
+                return None
+
+            self.ready.append(task)
+        except StopIteration as stop:
+            task.result = stop.value
+            return stop.value.error
+
+        return None
+
+    # resumes a task waiting on a channel no task is left to send to, the receive then fails
+    def release(self, task):
+        task.channel.waiting.remove(task)
+        task.resume_value = False
+        self.ready.append(task)
+
+    # runs ready tasks until done() is true or every task has finished or is waiting, or
+    # until tasks have been switched slices times. returns the error of the first task to fail
+    def run_until(self, done, slices=None):
+        while self.ready and not done() and slices != 0:
+            error = self.step(self.ready.popleft())
+            if error: return error
+            if slices: slices -= 1
+
+        return None
+
+    async def run_async(self, done):
+        interpreter = self.interpreter
+
+        while not done():
+            # tasks spawned while stepping belong to this scheduler, other runs on the same
+            # interpreter may be awaiting theirs
+            scheduler, interpreter.scheduler = interpreter.scheduler, self
+            try:
+                error = self.run_until(done, self.slices_per_await)
+            finally:
+                interpreter.scheduler = scheduler
+            if error: return error
+
+            if self.ready:
+                await asyncio.sleep(0)
+            elif self.pending:
+                finished, _ = await asyncio.wait(self.pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in finished:
+                    task = self.pending.pop(future)
+                    task.resume_value = future.result()
+                    self.ready.append(task)
+            else:
+                return None
+
+        return None
 
 #######################################
 #               run
 #######################################
 
-global_symbol_table = SymbolTable()
-global_symbol_table.set('null', Number.null)
-global_symbol_table.set('false', Number.false)
-global_symbol_table.set('true', Number.true)
-global_symbol_table.set('math_pi', Number.math_PI)
-global_symbol_table.set('print', BuiltInFunction.print)
-global_symbol_table.set('print_ret', BuiltInFunction.print_ret)
-global_symbol_table.set('input', BuiltInFunction.input)
-global_symbol_table.set('input_int', BuiltInFunction.input_int)
-global_symbol_table.set('clear', BuiltInFunction.clear)
-global_symbol_table.set('cls', BuiltInFunction.clear)
-global_symbol_table.set('is_num', BuiltInFunction.is_number)
-global_symbol_table.set('is_str', BuiltInFunction.is_string)
-global_symbol_table.set('is_list', BuiltInFunction.is_list)
-global_symbol_table.set('is_fun', BuiltInFunction.is_function)
-global_symbol_table.set('append', BuiltInFunction.append)
-global_symbol_table.set('pop', BuiltInFunction.pop)
-global_symbol_table.set('extend', BuiltInFunction.extend)
-global_symbol_table.set('len', BuiltInFunction.len)
-global_symbol_table.set('run', BuiltInFunction.run)
-
-def run(fn, text):
-        # generate tokens
-        lexer = Lexer(fn, text)
-        tokens, error = lexer.make_tokens()
-        if error: return None, error
+def populate_global_symbol_table(symbol_table):
+    symbol_table.set('null', Number.null)
+    symbol_table.set('false', Number.false)
+    symbol_table.set('true', Number.true)
+    symbol_table.set('math_pi', Number.math_PI)
+    symbol_table.set('math_e', Number.math_E)
+    symbol_table.set('print', BuiltInFunction.print)
+    symbol_table.set('print_ret', BuiltInFunction.print_ret)
+    symbol_table.set('input', BuiltInFunction.input)
+    symbol_table.set('input_int', BuiltInFunction.input_int)
+    symbol_table.set('clear', BuiltInFunction.clear)
+    symbol_table.set('cls', BuiltInFunction.clear)
+    symbol_table.set('is_num', BuiltInFunction.is_number)
+    symbol_table.set('is_str', BuiltInFunction.is_string)
+    symbol_table.set('is_list', BuiltInFunction.is_list)
+    symbol_table.set('is_fun', BuiltInFunction.is_function)
+    symbol_table.set('append', BuiltInFunction.append)
+    symbol_table.set('pop', BuiltInFunction.pop)
+    symbol_table.set('extend', BuiltInFunction.extend)
+    symbol_table.set('len', BuiltInFunction.len)
+    symbol_table.set('run', BuiltInFunction.run)
+    symbol_table.set('get', BuiltInFunction.get)
+    symbol_table.set('put', BuiltInFunction.put)
+    symbol_table.set('add', BuiltInFunction.add)
+    symbol_table.set('has', BuiltInFunction.has)
+    symbol_table.set('remove', BuiltInFunction.remove)
+    symbol_table.set('keys', BuiltInFunction.keys)
+    symbol_table.set('values', BuiltInFunction.values)
+    symbol_table.set('set', BuiltInFunction.set)
+    symbol_table.set('slice', BuiltInFunction.slice)
+    symbol_table.set('split', BuiltInFunction.split)
+    symbol_table.set('find', BuiltInFunction.find)
+    symbol_table.set('replace', BuiltInFunction.replace)
+    symbol_table.set('upper', BuiltInFunction.upper)
+    symbol_table.set('lower', BuiltInFunction.lower)
+    symbol_table.set('trim', BuiltInFunction.trim)
+    symbol_table.set('join', BuiltInFunction.join)
+    symbol_table.set('to_number', BuiltInFunction.to_number)
+    symbol_table.set('open', BuiltInFunction.open)
+    symbol_table.set('read_line', BuiltInFunction.read_line)
+    symbol_table.set('read_lines', BuiltInFunction.read_lines)
+    symbol_table.set('read_file', BuiltInFunction.read_file)
+    symbol_table.set('read_stdin', BuiltInFunction.read_stdin)
+    symbol_table.set('write', BuiltInFunction.write)
+    symbol_table.set('close', BuiltInFunction.close)
+    symbol_table.set('range', BuiltInFunction.range)
+    symbol_table.set('list', BuiltInFunction.list)
+    symbol_table.set('deque', BuiltInFunction.deque)
+    symbol_table.set('push_front', BuiltInFunction.push_front)
+    symbol_table.set('push_back', BuiltInFunction.push_back)
+    symbol_table.set('pop_front', BuiltInFunction.pop_front)
+    symbol_table.set('pop_back', BuiltInFunction.pop_back)
+    symbol_table.set('priority_queue', BuiltInFunction.priority_queue)
+    symbol_table.set('heap_push', BuiltInFunction.heap_push)
+    symbol_table.set('heap_pop', BuiltInFunction.heap_pop)
+    symbol_table.set('sqrt', BuiltInFunction.sqrt)
+    symbol_table.set('floor', BuiltInFunction.floor)
+    symbol_table.set('ceil', BuiltInFunction.ceil)
+    symbol_table.set('abs', BuiltInFunction.abs)
+    symbol_table.set('exp', BuiltInFunction.exp)
+    symbol_table.set('log', BuiltInFunction.log)
+    symbol_table.set('sin', BuiltInFunction.sin)
+    symbol_table.set('cos', BuiltInFunction.cos)
+    symbol_table.set('min', BuiltInFunction.min)
+    symbol_table.set('max', BuiltInFunction.max)
+    symbol_table.set('random', BuiltInFunction.random)
+    symbol_table.set('random_seed', BuiltInFunction.random_seed)
+    symbol_table.set('pmap', BuiltInFunction.pmap)
+    symbol_table.set('spawn', BuiltInFunction.spawn)
+    symbol_table.set('channel', BuiltInFunction.channel)
+    symbol_table.set('send', BuiltInFunction.send)
+    symbol_table.set('receive', BuiltInFunction.receive)
+    symbol_table.set('sleep', BuiltInFunction.sleep)
+
+output = Output()
+atexit.register(output.flush)
+
+# runs scripts for the module level run() and compile_program(), sharing one global scope
+default_interpreter = Interpreter(output)
+global_symbol_table = default_interpreter.global_symbol_table
+
+# not named compile, which would hide python's builtin inside this module
+def compile_program(fn, text, pooled=False, optimize=False):
+    return default_interpreter.compile(fn, text, pooled, optimize)
+
+def run(fn, text, max_steps=None, timeout=None, engine='tree', optimize=False):
+    return default_interpreter.run(fn, text, max_steps, timeout, engine, optimize)
+
+def start(fn, text, max_steps=None):
+    return default_interpreter.start(fn, text, max_steps)
+
+async def run_async(fn, text):
+    return await default_interpreter.run_async(fn, text)
 
-        # generate abstract syntax tree
-        parser = Parser(tokens)
-        ast = parser.parse()
-        if ast.error: return None, ast.error
+#######################################
+#             programs
+#######################################
+
+class Program:
+    def __init__(self, interpreter, fn, node, pooled=False):
+        self.interpreter = interpreter
+        self.fn = fn
+        self.node = node
+        # with pooling, the symbol tables of finished executions are cleared and reused
+        self.pooled = pooled
+        self.pool = []
+
+    def run_with(self, symbol_table, max_steps=None, timeout=None, engine='tree'):
+        if engine not in ('tree', 'stack', 'closure'):
+            raise Exception(f"unknown engine '{engine}'")
 
-        # run program
-        interpreter = Interpreter()
         context = Context('<program>')
-        context.symbol_table = global_symbol_table
-        result = interpreter.visit(ast.node, context)
+        context.symbol_table = symbol_table
+        context.interpreter = self.interpreter
+
+        # a run without budgets leaves the budgets of any run it was started from in place
+        budgeted = max_steps is not None or timeout is not None
+        if budgeted: self.interpreter.set_budget(max_steps, timeout)
+
+        # every run has a scheduler of its own, so a run started by the run() builtin only
+        # finishes its own tasks and leaves those of the script that started it alone
+        scheduler, self.interpreter.scheduler = self.interpreter.scheduler, Scheduler(self.interpreter)
+
+        try:
+            if engine == 'tree':
+                result = self.interpreter.visit(self.node, context)
+            elif engine == 'stack':
+                result = self.run_on_stack(context)
+            else:
+                result = self.run_compiled(context)
+
+            # tasks left over once the program finishes are run to completion, a failed program
+            # leaves none behind
+            if not result.error:
+                error = self.interpreter.scheduler.run_until(lambda: False)
+                if error: result = RTResult().failure(error)
+        finally:
+            self.interpreter.scheduler = scheduler
+            if budgeted: self.interpreter.set_budget()
+
+        self.interpreter.output.flush()
+        return result
+
+    def run_compiled(self, context):
+        interpreter = self.interpreter
+        instrumented = interpreter.budgeted or interpreter.hooks['visit']
+        compiler = interpreter.instrumented_closure_compiler if instrumented else interpreter.closure_compiler
+        return compiler.run(self.node, context)
+
+    # runs the program as a task on a resumable evaluator, taking turns with its tasks
+    def run_on_stack(self, context):
+        scheduler = self.interpreter.scheduler
+        evaluator = ResumableEvaluator(self.interpreter)
+        main = Task('<program>', evaluator.evaluate(self.node, context))
+        scheduler.ready.appendleft(main)
+
+        error = scheduler.run_until(lambda: main.result)
+
+        # the program is waiting on a channel no task is left to send to
+        if not error and not main.result:
+            scheduler.release(main)
+            error = scheduler.run_until(lambda: main.result)
+
+        return RTResult().failure(error) if error else main.result
+
+    # runs the program as a task alongside any it spawns, giving control back to the event
+    # loop regularly and while waiting on blocking builtins
+    async def run_async_with(self, symbol_table):
+        context = Context('<program>')
+        context.symbol_table = symbol_table
+        context.interpreter = self.interpreter
+        # runs awaited at the same time each have their own scheduler, like an execution
+        scheduler = Scheduler(self.interpreter)
+        scheduler.asynchronous = True
+
+        evaluator = ResumableEvaluator(self.interpreter, asynchronous=True)
+        main = Task('<program>', evaluator.evaluate(self.node, context))
+        scheduler.ready.append(main)
+
+        try:
+            error = await scheduler.run_async(lambda: main.result)
+
+            # the program is waiting on a channel no task is left to send to
+            if not error and not main.result:
+                scheduler.release(main)
+                error = await scheduler.run_async(lambda: main.result)
+
+            if not error:
+                error = await scheduler.run_async(lambda: False)
+        finally:
+            for future in scheduler.pending: future.cancel()
+
+        self.interpreter.output.flush()
+        return RTResult().failure(error) if error else main.result
+
+    # runs the program in its own scope on top of the globals, with the given python values
+    # bound as variables. returns the variables left in that scope as python values
+    def execute(self, globals=None, max_steps=None, timeout=None, engine='tree'):
+        symbol_table = self.pool.pop() if self.pool else SymbolTable(self.interpreter.global_symbol_table)
+
+        for name, value in (globals or {}).items():
+            symbol_table.set(name, to_value(value))
+
+        result = self.run_with(symbol_table, max_steps, timeout, engine)
+        outputs = {name: to_python(value) for name, value in symbol_table.symbols.items()}
+
+        if self.pooled:
+            symbol_table.symbols.clear()
+            self.pool.append(symbol_table)
+
+        return outputs, result.error
+
+class Execution:
+    # a run of a program which is paused every so many steps, so a host can take turns
+    # running many scripts. each execution has its own scheduler for the tasks it spawns
+    def __init__(self, program, symbol_table, max_steps=None):
+        self.program = program
+        self.max_steps = max_steps
+        self.steps = 0
+        self.scheduler = Scheduler(program.interpreter)
+
+        context = Context('<program>')
+        context.symbol_table = symbol_table
+        context.interpreter = program.interpreter
+
+        evaluator = ResumableEvaluator(program.interpreter)
+        self.main = Task('<program>', evaluator.evaluate(program.node, context))
+        self.scheduler.ready.append(self.main)
+
+        self.done = False
+        self.value = None
+        self.error = None
+
+    # runs the program for about the given number of steps, or to the end when steps is
+    # None. returns true once the program and its tasks have finished
+    def resume(self, steps=None):
+        if self.done: return True
+
+        interpreter = self.program.interpreter
+        scheduler, interpreter.scheduler = interpreter.scheduler, self.scheduler
+        pause_at = self.steps + steps if steps is not None else None
+        interpreter.set_budget(self.max_steps, pause_at=pause_at, steps=self.steps)
+
+        try:
+            error = self.scheduler.run_until(interpreter.should_pause)
+
+            # the program is waiting on a channel no task is left to send to
+            if not error and not self.scheduler.ready and not self.main.result:
+                self.scheduler.release(self.main)
+                error = self.scheduler.run_until(interpreter.should_pause)
+
+            if error or not self.scheduler.ready:
+                self.done = True
+                self.error = error or self.main.result.error
+                self.value = None if self.error else self.main.result.value
+                self.scheduler.ready.clear()
+        finally:
+            self.steps = interpreter.steps
+            interpreter.set_budget()
+            interpreter.scheduler = scheduler
+
+        interpreter.output.flush()
+        return self.done
+
+def to_value(value):
+    if isinstance(value, Value):
+        return value
+    if value is None:
+        return Number.null
+    if isinstance(value, (bool, int, float)):
+        return Number(int(value) if isinstance(value, bool) else value)
+    if isinstance(value, str):
+        return String(value)
+    if isinstance(value, (list, tuple)):
+        return List([to_value(element) for element in value])
+    if isinstance(value, dict):
+        entries = {}
+        for key, element in value.items():
+            key = to_value(key)
+            entries[key.hash_key()] = (key, to_value(element))
+        return Map(entries)
+    if isinstance(value, (set, frozenset)):
+        elements = [to_value(element) for element in value]
+        return Set({element.hash_key(): element for element in elements})
+    raise TypeError(f"cannot convert '{type(value).__name__}' to an arrianish value")
+
+# values with no python equivalent, such as functions, are returned as they are
+def to_python(value):
+    if isinstance(value, (Number, String)):
+        return value.value
+    if isinstance(value, List):
+        return [to_python(element) for element in value.elements]
+    if isinstance(value, Map):
+        return {to_python(key): to_python(element) for key, element in value.entries.values()}
+    if isinstance(value, Set):
+        return {to_python(element) for element in value.elements.values()}
+    return value
+
+#######################################
+#             parallel
+#######################################
 
-        return result.value, result.error
\ No newline at end of file
+# process pools used by pmap(), kept open and shared between calls with the same worker count
+pools = {}
+
+def get_pool(workers):
+    if workers not in pools:
+        pools[workers] = ProcessPoolExecutor(workers)
+    return pools[workers]
+
+# a pool is broken once one of its workers dies, so the next call starts a new one
+def drop_pool(workers):
+    pool = pools.pop(workers, None)
+    if pool: pool.shutdown(wait=False)
+
+def close_pools():
+    for pool in pools.values(): pool.shutdown()
+    pools.clear()
+
+atexit.register(close_pools)
+
+# values a function reads from the scope it was called from. the worker runs it against a
+# fresh global scope, so these are sent along with it, including functions it calls
+def capture_values(function, symbol_table):
+    captures = {}
+    functions = [function]
+
+    while functions:
+        function = functions.pop()
+        if not isinstance(function, Function): continue
+
+        names = set()
+        collect_names(function.body_node, names)
+
+        for name in names:
+            if name in captures: continue
+            value = symbol_table.get(name)
+            if value == None: continue
+            captures[name] = value
+            functions.append(value)
+
+    return captures
+
+def collect_names(node, names):
+    if isinstance(node, (list, tuple)):
+        for element in node: collect_names(element, names)
+    elif isinstance(node, VarAccessNode):
+        names.add(node.var_name_tok.value)
+    elif hasattr(node, '__dict__') and not isinstance(node, (Token, Position)):
+        for attribute in vars(node).values(): collect_names(attribute, names)
+
+# python errors raised in a worker are sent back as this, so they can't be taken for
+# values failing to be sent
+class WorkerError(Exception):
+    pass
+
+# the interpreter each worker process runs its chunks on, created on first use. what it
+# prints is collected and sent back with each chunk's results
+worker_interpreter = None
+worker_buffer = io.StringIO()
+
+def pmap_chunk(function, captures, elements):
+    try:
+        return run_chunk(function, captures, elements)
+    except Exception as e:
+        raise WorkerError(f'{type(e).__name__}: {e}') from None
+
+def run_chunk(function, captures, elements):
+    global worker_interpreter
+    if not worker_interpreter: worker_interpreter = Interpreter(Output(worker_buffer))
+    worker_buffer.seek(0)
+    worker_buffer.truncate()
+
+    context = Context('<worker>')
+    context.symbol_table = SymbolTable(worker_interpreter.global_symbol_table)
+    context.interpreter = worker_interpreter
+
+    for name, value in captures.items():
+        context.symbol_table.set(name, value)
+    function = function.copy().set_context(context)
+
+    results = []
+    error = None
+    for element in elements:
+        res = function.execute([element])
+        error = res.error
+        if error: break
+        results.append(res.value)
+
+    worker_interpreter.output.flush()
+    return results, error, worker_buffer.getvalue()
@@ -0,0 +1,194 @@
+import argparse
+import io
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import arrianish
+
+# runs many arrianish scripts, or one script against many input records, across worker processes
+#
+#   $ python3 batch.py scripts/ other.arrian --workers 8 --timeout 30
+#   $ python3 batch.py rule.arrian --records records.jsonl
+
+#######################################
+#              timeouts
+#######################################
+
+# jobs that run past their step or time budget fail with a runtime error. a single builtin
+# or operation can run for a long time without taking a step, so an alarm going off shortly
+# after the time budget stops the job if its budget hasn't
+GRACE = 1
+
+class Timeout(Exception):
+    pass
+
+def raise_timeout(signum, frame):
+    raise Timeout()
+
+def start_timer(timeout):
+    # alarms are only available on unix, elsewhere only the time budget applies
+    if timeout and hasattr(signal, 'SIGALRM'):
+        signal.signal(signal.SIGALRM, raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout + GRACE)
+
+def stop_timer(timeout):
+    if timeout and hasattr(signal, 'SIGALRM'):
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+#######################################
+#               jobs
+#######################################
+
+def run_script(path, max_steps, timeout):
+    buffer = io.StringIO()
+    interpreter = arrianish.Interpreter(arrianish.Output(buffer))
+    start = time.perf_counter()
+    error = None
+
+    try:
+        with open(path, 'r') as f:
+            script = f.read()
+
+        start_timer(timeout)
+        try:
+            _, error = interpreter.run(path, script, max_steps, timeout)
+        finally:
+            stop_timer(timeout)
+
+        if error: error = error.as_string()
+    except Timeout:
+        error = f'timed out after {timeout} seconds'
+    except Exception as e:
+        error = str(e)
+
+    interpreter.output.flush()
+    return {
+        'job': path,
+        'output': buffer.getvalue(),
+        'error': error,
+        'seconds': time.perf_counter() - start
+    }
+
+# each worker compiles the script once and reuses it for every record it is given, on an
+# interpreter of its own whose printed output is collected for each record
+programs = {}
+record_buffer = io.StringIO()
+record_interpreter = None
+
+def run_record(path, index, record, max_steps, timeout):
+    global record_interpreter
+    if not record_interpreter: record_interpreter = arrianish.Interpreter(arrianish.Output(record_buffer))
+
+    start = time.perf_counter()
+    outputs = {}
+    error = None
+    record_buffer.seek(0)
+    record_buffer.truncate()
+
+    try:
+        if path not in programs:
+            with open(path, 'r') as f:
+                program, error = record_interpreter.compile(path, f.read(), pooled=True)
+            if error: raise Exception(error.as_string())
+            programs[path] = program
+
+        start_timer(timeout)
+        try:
+            outputs, error = programs[path].execute(record, max_steps, timeout)
+        finally:
+            stop_timer(timeout)
+
+        if error: error = error.as_string()
+    except Timeout:
+        error = f'timed out after {timeout} seconds'
+    except Exception as e:
+        error = str(e)
+
+    record_interpreter.output.flush()
+    # only plain python values can be sent back from a worker
+    outputs = {name: value for name, value in outputs.items() if not isinstance(value, arrianish.Value)}
+    return {
+        'job': f'{path}:{index}',
+        'output': outputs,
+        'printed': record_buffer.getvalue(),
+        'error': error,
+        'seconds': time.perf_counter() - start
+    }
+
+#######################################
+#               batch
+#######################################
+
+def find_scripts(paths):
+    scripts = []
+
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                scripts.extend(os.path.join(root, name) for name in sorted(files) if name.endswith('.arrian'))
+        else:
+            scripts.append(path)
+
+    return scripts
+
+def read_records(path):
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def run_batch(paths, records=None, workers=None, max_steps=None, timeout=None):
+    with ProcessPoolExecutor(workers) as executor:
+        if records is None:
+            scripts = find_scripts(paths)
+            count = len(scripts)
+            jobs = executor.map(run_script, scripts, [max_steps] * count, [timeout] * count, chunksize=16)
+        else:
+            path = paths[0]
+            count = len(records)
+            jobs = executor.map(
+                run_record,
+                [path] * count, range(count), records, [max_steps] * count, [timeout] * count,
+                chunksize=64
+            )
+
+        for result in jobs:
+            yield result
+
+def main():
+    parser = argparse.ArgumentParser(description='run arrianish scripts in parallel')
+    parser.add_argument('paths', nargs='+', help='.arrian files or directories containing them')
+    parser.add_argument('--records', help='json lines file of inputs to run the script against, one execution per line')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes, defaults to the cpu count')
+    parser.add_argument('--max-steps', type=int, default=None, help='number of steps each job may take')
+    parser.add_argument('--timeout', type=float, default=None, help='seconds each job may run for')
+    parser.add_argument('--json', action='store_true', help='print every result as a json line')
+    args = parser.parse_args()
+
+    if args.records and len(args.paths) != 1:
+        parser.error('--records takes exactly one script')
+
+    records = read_records(args.records) if args.records else None
+    start = time.perf_counter()
+    completed, failed = 0, 0
+
+    for result in run_batch(args.paths, records, args.workers, args.max_steps, args.timeout):
+        completed += 1
+        if result['error']: failed += 1
+
+        if args.json:
+            print(json.dumps(result))
+        elif result['error']:
+            print(f"{result['job']} failed:\n{result['error']}\n", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f'{completed} jobs, {completed - failed} succeeded, {failed} failed in {elapsed:.2f} seconds '
+        f'({completed / elapsed if elapsed else 0:.1f} jobs per second)',
+        file=sys.stderr
+    )
+
+if __name__ == '__main__':
+    main()